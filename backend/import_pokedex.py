@@ -0,0 +1,435 @@
+"""Import a local PokeAPI data dump into MongoDB.
+
+Supports both published dump formats:
+
+* the JSON API mirror (``PokeAPI/api-data``), i.e. ``pokemon/<id>/index.json``
+  and ``pokemon-species/<id>/index.json``, optionally under ``data/api/v2``;
+* the CSV tables from the PokeAPI repository (``data/v2/csv``).
+
+Usage:
+    python import_pokedex.py /path/to/dump
+
+Two collections are produced: ``pokemon_catalog`` (compact list entries) and
+``pokemon_details`` (one prebuilt document per Pokemon with species data and
+moves already joined to their move and TM/HM records). Each is written to a
+staging collection and swapped in with a rename, so the running server never
+sees a half-imported catalog. Call POST /api/admin/pokemon/catalog/reload (or
+restart the server) afterwards.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+from pymongo import ASCENDING, MongoClient
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+SPRITE_URL = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{id}.png"
+CATALOG_COLLECTION = "pokemon_catalog"
+DETAILS_COLLECTION = "pokemon_details"
+DETAIL_LANGUAGES = ("it", "en")
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("import_pokedex")
+
+
+def _resource_id(url: str) -> int:
+    return int(url.rstrip("/").split("/")[-1])
+
+
+def _tm_number(item_name: str):
+    """'tm126' -> '126'; TRs and HMs have no TM number"""
+    if item_name.startswith("tm") and item_name[2:].isdigit():
+        return item_name[2:]
+    return None
+
+
+def build_move_sets(learned, moves: dict, machines: dict) -> dict:
+    """Group learnable moves by version group, joined with move and machine data.
+
+    ``learned`` yields (move_id, version_group, learn_method, level);
+    ``moves`` maps move ids to dicts with name/names/type/power/accuracy/pp/
+    damage_class; ``machines`` maps (move_id, version_group) to an item name.
+    """
+    move_sets = {}
+    for move_id, version_group, method, level in learned:
+        if method not in ("level-up", "machine"):
+            continue
+        move = moves.get(move_id)
+        if move is None:
+            continue
+        entry = {
+            "name": move["names"].get("it") or move["name"],
+            "englishName": move["name"],
+            "type": move["type"],
+            "power": move["power"],
+            "accuracy": move["accuracy"],
+            "pp": move["pp"],
+            "damageClass": move["damage_class"],
+            "level": level if method == "level-up" else None,
+            "tmNumber": None,
+        }
+        group = move_sets.setdefault(version_group, {"level_up": [], "machine": []})
+        if method == "level-up":
+            group["level_up"].append(entry)
+        else:
+            entry["tmNumber"] = _tm_number(machines.get((move_id, version_group), ""))
+            group["machine"].append(entry)
+    for group in move_sets.values():
+        group["level_up"].sort(key=lambda m: (m["level"] or 0, m["englishName"]))
+    return move_sets
+
+
+class JsonDump:
+    """PokeAPI api-data mirror: one index.json per resource"""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    @classmethod
+    def detect(cls, path: Path):
+        for candidate in (path, path / "data" / "api" / "v2", path / "api" / "v2"):
+            if (candidate / "pokemon").is_dir() and any((candidate / "pokemon").glob("*/index.json")):
+                return cls(candidate)
+        return None
+
+    def _load(self, resource: str, resource_id) -> dict:
+        path = self.root / resource / str(resource_id) / "index.json"
+        if not path.exists():
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _resource_ids(self, resource: str):
+        ids = []
+        for entry in (self.root / resource).iterdir():
+            if entry.name.isdigit() and (entry / "index.json").exists():
+                ids.append(int(entry.name))
+        return sorted(ids)
+
+    def _load_move(self, move_id: int, machines: dict):
+        move = self._load("move", move_id)
+        if not move:
+            return None
+        for version_machine in move.get("machines", []):
+            machine = self._load("machine", _resource_id(version_machine["machine"]["url"]))
+            if machine:
+                machines[(move_id, version_machine["version_group"]["name"])] = machine["item"]["name"]
+        return {
+            "name": move["name"],
+            "names": {n["language"]["name"]: n["name"] for n in move.get("names", [])},
+            "type": move["type"]["name"],
+            "power": move.get("power"),
+            "accuracy": move.get("accuracy"),
+            "pp": move.get("pp"),
+            "damage_class": (move.get("damage_class") or {}).get("name"),
+        }
+
+    def iter_details(self):
+        moves = {}
+        machines = {}
+        species_cache = {}
+        for pokemon_id in self._resource_ids("pokemon"):
+            pokemon = self._load("pokemon", pokemon_id)
+            species_id = _resource_id(pokemon["species"]["url"])
+            if species_id not in species_cache:
+                species_cache[species_id] = self._load("pokemon-species", species_id)
+            species = species_cache[species_id]
+
+            learned = []
+            for move in pokemon.get("moves", []):
+                move_id = _resource_id(move["move"]["url"])
+                if move_id not in moves:
+                    moves[move_id] = self._load_move(move_id, machines)
+                for details in move["version_group_details"]:
+                    learned.append((
+                        move_id,
+                        details["version_group"]["name"],
+                        details["move_learn_method"]["name"],
+                        details.get("level_learned_at"),
+                    ))
+
+            sprites = pokemon.get("sprites") or {}
+            artwork = ((sprites.get("other") or {}).get("official-artwork") or {}).get("front_default")
+            yield {
+                "id": pokemon["id"],
+                "name": pokemon["name"],
+                "pokemon": {
+                    "id": pokemon["id"],
+                    "name": pokemon["name"],
+                    "height": pokemon.get("height"),
+                    "weight": pokemon.get("weight"),
+                    "base_experience": pokemon.get("base_experience"),
+                    "types": pokemon["types"],
+                    "stats": [{"base_stat": s["base_stat"], "stat": {"name": s["stat"]["name"]}} for s in pokemon["stats"]],
+                    "abilities": pokemon.get("abilities", []),
+                    "sprites": {
+                        "front_default": sprites.get("front_default"),
+                        "other": {"official-artwork": {"front_default": artwork}},
+                    },
+                },
+                "species": {
+                    "id": species_id,
+                    "name": species.get("name", pokemon["name"]),
+                    "names": species.get("names", []),
+                    "genera": [g for g in species.get("genera", []) if g["language"]["name"] in DETAIL_LANGUAGES],
+                    "flavor_text_entries": [
+                        f for f in species.get("flavor_text_entries", []) if f["language"]["name"] in DETAIL_LANGUAGES
+                    ],
+                },
+                "move_sets": build_move_sets(learned, moves, machines),
+            }
+
+    def iter_catalog(self):
+        species_names = {}
+        for pokemon_id in self._resource_ids("pokemon"):
+            pokemon = self._load("pokemon", pokemon_id)
+            species_id = _resource_id(pokemon["species"]["url"])
+            if species_id not in species_names:
+                species = self._load("pokemon-species", species_id)
+                species_names[species_id] = {
+                    n["language"]["name"]: n["name"] for n in species.get("names", [])
+                }
+            yield {
+                "id": pokemon["id"],
+                "name": pokemon["name"],
+                "species_id": species_id,
+                "types": [t["type"]["name"] for t in sorted(pokemon["types"], key=lambda t: t["slot"])],
+                "stats": {s["stat"]["name"]: s["base_stat"] for s in pokemon["stats"]},
+                "height": pokemon.get("height"),
+                "weight": pokemon.get("weight"),
+                "base_experience": pokemon.get("base_experience"),
+                "sprite": (pokemon.get("sprites") or {}).get("front_default") or SPRITE_URL.format(id=pokemon["id"]),
+                "names": species_names[species_id],
+            }
+
+
+class CsvDump:
+    """PokeAPI CSV tables (data/v2/csv)"""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    @classmethod
+    def detect(cls, path: Path):
+        for candidate in (path, path / "data" / "v2" / "csv", path / "csv"):
+            if (candidate / "pokemon.csv").exists():
+                return cls(candidate)
+        return None
+
+    def _rows(self, table: str):
+        path = self.root / f"{table}.csv"
+        if not path.exists():
+            return
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+    def _identifiers(self, table: str) -> dict:
+        return {int(row["id"]): row["identifier"] for row in self._rows(table)}
+
+    @staticmethod
+    def _int(value):
+        return int(value) if value not in (None, "") else None
+
+    def iter_details(self):
+        type_names = self._identifiers("types")
+        language_codes = self._identifiers("languages")
+        version_groups = self._identifiers("version_groups")
+        learn_methods = self._identifiers("pokemon_move_methods")
+        damage_classes = self._identifiers("move_damage_classes")
+        items = self._identifiers("items")
+
+        move_names = {}
+        for row in self._rows("move_names"):
+            language = language_codes.get(int(row["local_language_id"]))
+            if language in DETAIL_LANGUAGES:
+                move_names.setdefault(int(row["move_id"]), {})[language] = row["name"]
+        moves = {
+            int(row["id"]): {
+                "name": row["identifier"],
+                "names": move_names.get(int(row["id"]), {}),
+                "type": type_names.get(self._int(row["type_id"])),
+                "power": self._int(row["power"]),
+                "accuracy": self._int(row["accuracy"]),
+                "pp": self._int(row["pp"]),
+                "damage_class": damage_classes.get(self._int(row["damage_class_id"])),
+            }
+            for row in self._rows("moves")
+        }
+        machines = {
+            (int(row["move_id"]), version_groups[int(row["version_group_id"])]): items.get(int(row["item_id"]), "")
+            for row in self._rows("machines")
+        }
+
+        learned = {}
+        for row in self._rows("pokemon_moves"):
+            learned.setdefault(int(row["pokemon_id"]), []).append((
+                int(row["move_id"]),
+                version_groups[int(row["version_group_id"])],
+                learn_methods[int(row["pokemon_move_method_id"])],
+                self._int(row["level"]),
+            ))
+
+        species_names = {}
+        for row in self._rows("pokemon_species_names"):
+            language = language_codes.get(int(row["local_language_id"]))
+            if language:
+                species_names.setdefault(int(row["pokemon_species_id"]), []).append(
+                    {"language": {"name": language}, "name": row["name"]}
+                )
+                if language in DETAIL_LANGUAGES and row.get("genus"):
+                    species_names.setdefault(("genera", int(row["pokemon_species_id"])), []).append(
+                        {"language": {"name": language}, "genus": row["genus"]}
+                    )
+
+        for entry in self.iter_catalog():
+            yield {
+                "id": entry["id"],
+                "name": entry["name"],
+                "pokemon": {
+                    "id": entry["id"],
+                    "name": entry["name"],
+                    "height": entry["height"],
+                    "weight": entry["weight"],
+                    "base_experience": entry["base_experience"],
+                    "types": [{"slot": i + 1, "type": {"name": t}} for i, t in enumerate(entry["types"])],
+                    "stats": [{"base_stat": v, "stat": {"name": k}} for k, v in entry["stats"].items()],
+                    "abilities": [],
+                    "sprites": {
+                        "front_default": entry["sprite"],
+                        "other": {"official-artwork": {"front_default": None}},
+                    },
+                },
+                "species": {
+                    "id": entry["species_id"],
+                    "name": entry["name"],
+                    "names": species_names.get(entry["species_id"], []),
+                    "genera": species_names.get(("genera", entry["species_id"]), []),
+                    "flavor_text_entries": [],
+                },
+                "move_sets": build_move_sets(learned.get(entry["id"], []), moves, machines),
+            }
+
+    def iter_catalog(self):
+        type_names = self._identifiers("types")
+        stat_names = self._identifiers("stats")
+        language_codes = self._identifiers("languages")
+
+        types = {}
+        for row in self._rows("pokemon_types"):
+            types.setdefault(int(row["pokemon_id"]), []).append((int(row["slot"]), type_names[int(row["type_id"])]))
+        stats = {}
+        for row in self._rows("pokemon_stats"):
+            stats.setdefault(int(row["pokemon_id"]), {})[stat_names[int(row["stat_id"])]] = int(row["base_stat"])
+        names = {}
+        for row in self._rows("pokemon_species_names"):
+            language = language_codes.get(int(row["local_language_id"]))
+            if language:
+                names.setdefault(int(row["pokemon_species_id"]), {})[language] = row["name"]
+
+        for row in sorted(self._rows("pokemon"), key=lambda r: int(r["id"])):
+            pokemon_id = int(row["id"])
+            species_id = int(row["species_id"])
+            yield {
+                "id": pokemon_id,
+                "name": row["identifier"],
+                "species_id": species_id,
+                "types": [name for _, name in sorted(types.get(pokemon_id, []))],
+                "stats": stats.get(pokemon_id, {}),
+                "height": self._int(row.get("height")),
+                "weight": self._int(row.get("weight")),
+                "base_experience": self._int(row.get("base_experience")),
+                "sprite": SPRITE_URL.format(id=pokemon_id),
+                "names": names.get(species_id, {}),
+            }
+
+
+def open_dump(path: Path):
+    dump = JsonDump.detect(path) or CsvDump.detect(path)
+    if dump is None:
+        raise SystemExit(f"No PokeAPI JSON or CSV dump found under {path}")
+    logger.info(f"Reading {type(dump).__name__} from {dump.root}")
+    return dump
+
+
+def replace_collection(db, name: str, documents: list, indexes: list):
+    """Load documents into a staging collection and atomically swap it in"""
+    staging = db[f"{name}_staging"]
+    staging.drop()
+    if documents:
+        staging.insert_many(documents, ordered=False)
+    for keys, options in indexes:
+        staging.create_index(keys, **options)
+    staging.rename(name, dropTarget=True)
+
+
+def _content_version(documents: list) -> str:
+    digest = hashlib.sha256()
+    for document in documents:
+        digest.update(json.dumps(document, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _record_version(db, name: str, documents: list, version: str):
+    db.catalog_meta.update_one(
+        {"_id": name},
+        {"$set": {
+            "version": version,
+            "count": len(documents),
+            "imported_at": datetime.now(timezone.utc).isoformat()
+        }},
+        upsert=True
+    )
+    logger.info(f"Imported {len(documents)} documents into {name} (version {version})")
+
+
+def import_catalog(db, dump):
+    entries = list(dump.iter_catalog())
+    version = _content_version(entries)
+    replace_collection(db, CATALOG_COLLECTION, entries, [
+        ([("id", ASCENDING)], {"name": "id_unique", "unique": True}),
+        ([("name", ASCENDING)], {"name": "name"}),
+    ])
+    _record_version(db, CATALOG_COLLECTION, entries, version)
+
+
+def import_details(db, dump):
+    details = list(dump.iter_details())
+    version = _content_version(details)
+    replace_collection(db, DETAILS_COLLECTION, details, [
+        ([("id", ASCENDING)], {"name": "id_unique", "unique": True}),
+    ])
+    _record_version(db, DETAILS_COLLECTION, details, version)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a local PokeAPI data dump")
+    parser.add_argument("path", type=Path, help="Directory containing the JSON or CSV dump")
+    parser.add_argument("--skip-details", action="store_true", help="Only import the catalog list")
+    args = parser.parse_args(argv)
+
+    client = MongoClient(os.environ['MONGO_URL'])
+    try:
+        db = client[os.environ['DB_NAME']]
+        dump = open_dump(args.path)
+        import_catalog(db, dump)
+        if not args.skip_details:
+            import_details(db, dump)
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,374 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument, UpdateOne, ReplaceOne, DeleteMany, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
 import os
+import re
+import csv
+import codecs
+import io
+import json
+import base64
+import time
+import hashlib
+import math
+import textwrap
+import unicodedata
 import logging
 import asyncio
+import smtplib
+import multiprocessing
+from email.message import EmailMessage
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import random
+import threading
+import contextvars
+from collections import Counter as TallyCounter, OrderedDict
+from itertools import chain
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, ValidationError
 from typing import List, Optional
 import uuid
+import numpy as np
 from datetime import datetime, timezone, timedelta
 import jwt
 from passlib.context import CryptContext
 import resend
 
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib encoder
+    orjson = None
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# ============== METRICS ==============
+# Defined before the Mongo client, which needs the command listener at creation.
+
+class Metric:
+    """One metric family in the Prometheus text exposition format"""
+
+    def __init__(self, name: str, help_text: str, kind: str, label_names: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _label_text(self, key: tuple, extra: str = "") -> str:
+        pairs = [
+            f'{name}="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+            for name, value in zip(self.label_names, key)
+        ]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self):
+        with self._lock:
+            return list(self._values.items())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self.samples():
+            lines.append(f"{self.name}{self._label_text(key)} {float(value)!r}")
+        return lines
+
+class Counter(Metric):
+    def __init__(self, name, help_text, label_names=()):
+        super().__init__(name, help_text, "counter", label_names)
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    def __init__(self, name, help_text, label_names=()):
+        super().__init__(name, help_text, "gauge", label_names)
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(Metric):
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, "histogram", label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self._lock:
+            return [(key, ([*counts], total, count)) for key, (counts, total, count) in self._values.items()]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for key, (counts, total, count) in self.samples():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = self._label_text(key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = self._label_text(key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {total!r}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {count}")
+        return lines
+
+class CallbackMetric(Metric):
+    """Metric read at scrape time from a function returning {label values: value}"""
+
+    def __init__(self, name, help_text, kind, label_names, collect):
+        super().__init__(name, help_text, kind, label_names)
+        self.collect = collect
+
+    def samples(self):
+        return list(self.collect().items())
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+http_requests_total = metrics.register(Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")))
+http_request_duration = metrics.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")))
+http_requests_in_progress = metrics.register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served"))
+mongo_command_duration = metrics.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency by collection", ("collection", "command")))
+mongo_command_failures = metrics.register(Counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands by collection", ("collection", "command")))
+password_hash_duration = metrics.register(Histogram(
+    "password_hash_duration_seconds", "bcrypt time per call, excluding queueing", ("operation",),
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0)))
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every MongoDB command by collection and command name"""
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        command = event.command
+        target = command.get("collection") if event.command_name == "getMore" else command.get(event.command_name)
+        self._collections[(event.connection_id, event.request_id)] = target if isinstance(target, str) else ""
+
+    def _finish(self, event) -> str:
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        mongo_command_duration.observe(event.duration_micros / 1e6, collection=collection, command=event.command_name)
+        return collection
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        collection = self._finish(event)
+        mongo_command_failures.inc(collection=collection, command=event.command_name)
+
+mongo_command_listener = MongoCommandMetrics()
+
+# ============== SLOW QUERY LOG ==============
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '100'))
+SLOW_QUERY_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_SAMPLE_RATE', '1.0'))  # share of slow ops explained
+SLOW_QUERY_RETENTION_DAYS = int(os.environ.get('SLOW_QUERY_RETENTION_DAYS', '7'))
+
+# ASGI scope of the request being served, used to attribute commands to a route
+request_scope = contextvars.ContextVar("request_scope", default=None)
+
+slow_queries_total = metrics.register(Counter(
+    "mongodb_slow_commands_total", "MongoDB commands slower than SLOW_QUERY_MS", ("collection", "command")))
+
+# Where each explainable command keeps its filter
+FILTER_FIELDS = {
+    "find": lambda c: c.get("filter"),
+    "count": lambda c: c.get("query"),
+    "distinct": lambda c: c.get("query"),
+    "findAndModify": lambda c: c.get("query"),
+    "update": lambda c: (c.get("updates") or [{}])[0].get("q"),
+    "delete": lambda c: (c.get("deletes") or [{}])[0].get("q"),
+    "aggregate": lambda c: c.get("pipeline"),
+}
+
+def query_shape(value):
+    """Replace literal values with their type names, keeping field and operator names"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        if value and all(isinstance(item, dict) for item in value):
+            return [query_shape(item) for item in value]
+        return f"<array[{len(value)}]>"
+    return f"<{type(value).__name__}>"
+
+def plan_summary(plan: dict) -> str:
+    """'FETCH > IXSCAN(user_id_1)' style summary of a winning plan"""
+    stages = []
+    while plan:
+        stage = plan.get("stage", "?")
+        if plan.get("indexName"):
+            stage += f"({plan['indexName']})"
+        stages.append(stage)
+        inputs = plan.get("inputStages") or []
+        plan = plan.get("inputStage") or (inputs[0] if inputs else None)
+    return " > ".join(stages)
+
+def redact_plan(value):
+    """Winning plan without literal values: index bounds dropped, filters reduced to their shape"""
+    if isinstance(value, dict):
+        return {
+            key: query_shape(item) if key == "filter" else redact_plan(item)
+            for key, item in value.items() if key != "indexBounds"
+        }
+    if isinstance(value, list):
+        return [redact_plan(item) for item in value]
+    return value
+
+class SlowQueryLog(monitoring.CommandListener):
+    """Logs MongoDB commands over SLOW_QUERY_MS and samples their plans.
+
+    The listener runs on driver threads; slow commands are handed to the
+    event loop, where a background task runs explain and stores the result
+    in the slow_queries collection.
+    """
+
+    def __init__(self, threshold_ms: float, sample_rate: float):
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self._started = {}
+        self._loop = None
+        self._queue = None
+        self._task = None
+
+    def started(self, event):
+        if event.command_name in FILTER_FIELDS and event.command.get(event.command_name) != "slow_queries":
+            scope = request_scope.get()
+            route = getattr(scope.get("route"), "path", scope.get("path")) if scope else "background"
+            self._started[(event.connection_id, event.request_id)] = (event.command, route)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        entry = self._started.pop((event.connection_id, event.request_id), None)
+        if entry is None or event.duration_micros / 1e6 < self.threshold:
+            return
+        
+        command, route = entry
+        collection = command.get(event.command_name)
+        duration_ms = event.duration_micros / 1000
+        shape = query_shape(FILTER_FIELDS[event.command_name](command) or {})
+        slow_queries_total.inc(collection=collection, command=event.command_name)
+        logger.warning(f"Slow {event.command_name} on {collection} ({duration_ms:.1f} ms) from {route}: {json.dumps(shape)}")
+        
+        if self._loop is not None and random.random() < self.sample_rate:
+            # Session and cluster fields cannot be replayed inside explain
+            explainable = {k: v for k, v in command.items() if not k.startswith("$") and k not in ("lsid", "txnNumber")}
+            # explain only accepts write batches of one statement; the first stands for the batch
+            for batch in ("updates", "deletes"):
+                if batch in explainable:
+                    explainable[batch] = explainable[batch][:1]
+            record = {
+                "collection": collection,
+                "command_name": event.command_name,
+                "shape": shape,
+                "duration_ms": round(duration_ms, 2),
+                "route": route,
+                "command": explainable
+            }
+            self._loop.call_soon_threadsafe(self._enqueue, record)
+
+    def _enqueue(self, record: dict):
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            pass
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=100)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._loop = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            record = await self._queue.get()
+            try:
+                await self._capture(record)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Could not capture slow query plan")
+
+    async def _capture(self, record: dict):
+        command = record.pop("command")
+        explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+        planner = explain.get("queryPlanner") or (explain.get("stages") or [{}])[0].get("$cursor", {}).get("queryPlanner", {})
+        winning_plan = planner.get("winningPlan", {})
+        await db.slow_queries.insert_one({
+            "id": str(uuid.uuid4()),
+            **record,
+            "plan": plan_summary(winning_plan.get("queryPlan", winning_plan)),
+            "winning_plan": redact_plan(winning_plan),
+            "recorded_at": datetime.now(timezone.utc)
+        })
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_MS, SLOW_QUERY_SAMPLE_RATE)
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[mongo_command_listener, slow_query_log])
 db = client[os.environ['DB_NAME']]
 
 # Resend setup
@@ -28,6 +376,19 @@ resend.api_key = os.environ.get('RESEND_API_KEY', '')
 SENDER_EMAIL = os.environ.get('SENDER_EMAIL', 'onboarding@resend.dev')
 RECIPIENT_EMAIL = os.environ.get('RECIPIENT_EMAIL', 'test@gmail.com')
 
+# Email outbox (emails are persisted first and sent by a background worker)
+EMAIL_TRANSPORT = os.environ.get('EMAIL_TRANSPORT', 'resend')  # resend, smtp, file
+EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE', '20'))
+EMAIL_OUTBOX_CONCURRENCY = int(os.environ.get('EMAIL_OUTBOX_CONCURRENCY', '4'))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', '6'))
+EMAIL_OUTBOX_BACKOFF_SECONDS = float(os.environ.get('EMAIL_OUTBOX_BACKOFF_SECONDS', '30'))
+EMAIL_OUTBOX_POLL_SECONDS = float(os.environ.get('EMAIL_OUTBOX_POLL_SECONDS', '10'))
+EMAIL_OUTBOX_LEASE_SECONDS = 300
+EMAIL_OUTBOX_RETENTION_DAYS = int(os.environ.get('EMAIL_OUTBOX_RETENTION_DAYS', '7'))  # sent emails are then deleted
+EMAIL_FILE_DIR = Path(os.environ.get('EMAIL_FILE_DIR', ROOT_DIR / 'outbox_mail'))
+SMTP_HOST = os.environ.get('SMTP_HOST', 'localhost')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', '1025'))
+
 # JWT settings
 JWT_SECRET = os.environ.get('JWT_SECRET', 'pokemon-academy-secret-key-2024')
 JWT_ALGORITHM = "HS256"
@@ -37,9 +398,65 @@ JWT_EXPIRATION_HOURS = 24
 ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', 'aquilareale.mz@gmail.com')
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'Init1234')
 
+# Authentication cache (decoded tokens and user documents)
+AUTH_CACHE_TTL_SECONDS = float(os.environ.get('AUTH_CACHE_TTL_SECONDS', '60'))
+AUTH_CACHE_MAX_ENTRIES = int(os.environ.get('AUTH_CACHE_MAX_ENTRIES', '10000'))
+
+# Keyset pagination for list endpoints
+MAX_PAGE_SIZE = 1000
+
+# Serve list routes with FastJSONResponse, skipping response re-validation
+FAST_JSON_RESPONSES = os.environ.get('FAST_JSON_RESPONSES', 'false').lower() == 'true'
+
+# News feed cache (per process; the TTL bounds staleness across workers)
+NEWS_CACHE_TTL_SECONDS = float(os.environ.get('NEWS_CACHE_TTL_SECONDS', '30'))
+
+# Pokemon catalog (imported offline with import_pokedex.py)
+CATALOG_MAX_PAGE_SIZE = 2000
+CATALOG_FIELDS = ("id", "name", "species_id", "types", "stats", "height", "weight", "base_experience", "sprite", "names")
+
+# Quiz export (documents per cursor batch and per streamed chunk)
+QUIZ_EXPORT_BATCH_SIZE = int(os.environ.get('QUIZ_EXPORT_BATCH_SIZE', '1000'))
+
+# Pokemon name search (in-memory index rebuilt on every catalog load)
+SEARCH_MAX_RESULTS = 50
+
+# Admin user search (strength 2 ignores case but not accents)
+USER_SEARCH_COLLATION = {"locale": "en", "strength": 2}
+
+# Server-sent events (/api/events)
+EVENTS_SOURCE = os.environ.get('EVENTS_SOURCE', 'local')  # local, changestream (needs a replica set)
+EVENTS_HEARTBEAT_SECONDS = float(os.environ.get('EVENTS_HEARTBEAT_SECONDS', '15'))
+EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', '64'))  # per connection
+EVENTS_TOKEN_SECONDS = 60  # lifetime of the stream token passed in the /api/events URL
+
+# Bulk pokemon assignment
+BULK_POKEMON_MAX_ITEMS = int(os.environ.get('BULK_POKEMON_MAX_ITEMS', '5000'))
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Password hashing pool (bcrypt runs off the event loop)
+PASSWORD_HASH_EXECUTOR = os.environ.get('PASSWORD_HASH_EXECUTOR', 'thread')  # thread, process
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', '32'))
+
+# Quiz result PDFs (rendered in a process pool, cached on disk by content hash)
+QUIZ_PDF_DIR = Path(os.environ.get('QUIZ_PDF_DIR', ROOT_DIR / 'pdf_cache'))
+QUIZ_PDF_WORKERS = int(os.environ.get('QUIZ_PDF_WORKERS', '2'))
+QUIZ_PDF_CACHE_MAX_FILES = int(os.environ.get('QUIZ_PDF_CACHE_MAX_FILES', '1000'))  # least recently used are pruned
+
+# Login and registration rate limits
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')  # memory, mongo, off
+RATE_LIMIT_IP_BURST = int(os.environ.get('RATE_LIMIT_IP_BURST', '20'))  # token bucket size per IP
+RATE_LIMIT_IP_PER_MINUTE = float(os.environ.get('RATE_LIMIT_IP_PER_MINUTE', '30'))  # refill rate per IP
+RATE_LIMIT_ACCOUNT_ATTEMPTS = int(os.environ.get('RATE_LIMIT_ACCOUNT_ATTEMPTS', '10'))
+RATE_LIMIT_ACCOUNT_WINDOW_SECONDS = int(os.environ.get('RATE_LIMIT_ACCOUNT_WINDOW_SECONDS', '300'))
+RATE_LIMIT_TRUST_FORWARDED_FOR = os.environ.get('RATE_LIMIT_TRUST_FORWARDED_FOR', 'false').lower() == 'true'
+
+# Bulk user import (rows hashed and inserted together)
+USER_IMPORT_BATCH_SIZE = int(os.environ.get('USER_IMPORT_BATCH_SIZE', '200'))
+
 # Security
 security = HTTPBearer()
 
@@ -119,6 +536,116 @@ class UserPokemon(BaseModel):
     pokemon_name: str
     assigned_at: str
 
+class BulkPokemonAssignItem(BaseModel):
+    user_id: str
+    pokemon_id: int
+    pokemon_name: str
+
+class BulkPokemonAssign(BaseModel):
+    items: List[BulkPokemonAssignItem] = Field(..., max_length=BULK_POKEMON_MAX_ITEMS)
+
+class BulkPokemonRemoveItem(BaseModel):
+    user_id: str
+    pokemon_id: int
+
+class BulkPokemonRemove(BaseModel):
+    items: List[BulkPokemonRemoveItem] = Field(..., max_length=BULK_POKEMON_MAX_ITEMS)
+
+# ============== DATABASE INDEXES ==============
+
+# Every index the queries below rely on. Uniqueness is enforced here rather
+# than with find-then-insert checks in the routes.
+INDEXES = {
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)], name="created_at_id"),
+        # Case-insensitive prefix search; queries must pass the same USER_SEARCH_COLLATION
+        IndexModel([("username", ASCENDING), ("id", ASCENDING)], name="username_id_ci", collation=USER_SEARCH_COLLATION),
+        IndexModel([("email", ASCENDING), ("id", ASCENDING)], name="email_id_ci", collation=USER_SEARCH_COLLATION),
+    ],
+    "news": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("is_active", ASCENDING), ("created_at", ASCENDING)], name="is_active_created_at"),
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)], name="created_at_id"),
+    ],
+    "quiz_responses": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("submitted_at", ASCENDING), ("id", ASCENDING)], name="user_id_submitted_at_id"),
+        IndexModel([("submitted_at", ASCENDING), ("id", ASCENDING)], name="submitted_at_id"),
+        IndexModel([("profile", ASCENDING), ("submitted_at", ASCENDING), ("id", ASCENDING)], name="profile_submitted_at_id"),
+    ],
+    "user_pokemon": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("pokemon_id", ASCENDING)], name="user_id_pokemon_id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("assigned_at", ASCENDING), ("id", ASCENDING)], name="user_id_assigned_at_id"),
+    ],
+    "rate_limits": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "slow_queries": [
+        IndexModel([("duration_ms", DESCENDING)], name="duration_ms"),
+        IndexModel([("recorded_at", ASCENDING)], name="recorded_at_ttl",
+                   expireAfterSeconds=SLOW_QUERY_RETENTION_DAYS * 86400),
+    ],
+    "email_outbox": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt_at"),
+        IndexModel([("claim_id", ASCENDING)], name="claim_id"),
+        IndexModel([("sent_at", ASCENDING)], name="sent_at_ttl",
+                   expireAfterSeconds=EMAIL_OUTBOX_RETENTION_DAYS * 86400),
+    ],
+}
+
+# Unique indexes the write paths rely on instead of checking before inserting
+REQUIRED_INDEXES = {
+    "users": ("email_unique", "username_unique"),
+    "user_pokemon": ("user_id_pokemon_id_unique",),
+}
+
+async def ensure_indexes():
+    """Create the declared indexes one by one and fail if a required one is missing"""
+    missing_required = []
+    for collection_name, models in INDEXES.items():
+        collection = db[collection_name]
+        for model in models:
+            # One at a time: create_indexes is all-or-nothing per call
+            try:
+                await collection.create_indexes([model])
+            except OperationFailure as e:
+                # Usually pre-existing duplicate data or an index with the same name but other options
+                logger.error(f"Could not create index {model.document['name']} on {collection_name}: {e}")
+        
+        existing = {index["name"] async for index in collection.list_indexes()}
+        missing = [model.document["name"] for model in models if model.document["name"] not in existing]
+        if missing:
+            logger.warning(f"Missing indexes on {collection_name}: {', '.join(missing)}")
+        else:
+            logger.info(f"Indexes ready on {collection_name}")
+        missing_required += [f"{collection_name}.{name}" for name in REQUIRED_INDEXES.get(collection_name, ()) if name in missing]
+    
+    if missing_required:
+        raise RuntimeError(
+            f"Required unique indexes missing: {', '.join(missing_required)}. "
+            "Remove the duplicate documents and restart."
+        )
+
+def duplicate_key_field(error) -> Optional[str]:
+    """Return the first field of the unique index that rejected the write.
+
+    Accepts a DuplicateKeyError or one writeErrors entry of a BulkWriteError.
+    """
+    details = error if isinstance(error, dict) else (error.details or {})
+    key_pattern = details.get("keyPattern")
+    if key_pattern:
+        return next(iter(key_pattern))
+    message = details.get("errmsg", "") if isinstance(error, dict) else str(error)
+    for field in ("email", "username", "pokemon_id", "id"):
+        if f"{field}_" in message or f"{field}:" in message:
+            return field
+    return None
+
 # ============== HELPER FUNCTIONS ==============
 
 def hash_password(password: str) -> str:
@@ -127,6 +654,102 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def _timed_call(fn, *args):
+    """Run fn in a pool worker and report how long the call itself took"""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+class PasswordHasher:
+    """Bounded worker pool for bcrypt hashing and verification.
+
+    At most ``workers + queue_size`` calls may be in flight; anything beyond
+    that is rejected with a 503 instead of piling up behind the pool.
+    hash_many() is for admin jobs: it waits for capacity instead of being
+    rejected, and keeps at most ``workers`` hashes of its own in flight.
+    """
+
+    def __init__(self, kind: str, workers: int, queue_size: int):
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_pending = self.workers + max(0, queue_size)
+        self.pending = 0
+        self.calls = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.total_wait_seconds = 0.0
+        self.max_seconds = 0.0
+        self._executor = None
+        self._capacity = asyncio.Condition()  # notified whenever a call finishes
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def _run(self, fn, *args, wait: bool = False):
+        if wait:
+            async with self._capacity:
+                await self._capacity.wait_for(lambda: self.pending < self.max_pending)
+        elif self.pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning(f"Password hashing pool saturated ({self.pending} pending), rejecting request")
+            raise HTTPException(
+                status_code=503,
+                detail="Server sovraccarico, riprova tra qualche secondo",
+                headers={"Retry-After": "1"}
+            )
+        
+        self.pending += 1
+        submitted = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, duration = await loop.run_in_executor(self._get_executor(), _timed_call, fn, *args)
+        finally:
+            self.pending -= 1
+            async with self._capacity:
+                self._capacity.notify()
+        
+        wait = max(0.0, time.perf_counter() - submitted - duration)
+        self.calls += 1
+        self.total_seconds += duration
+        self.total_wait_seconds += wait
+        self.max_seconds = max(self.max_seconds, duration)
+        password_hash_duration.observe(duration, operation=fn.__name__)
+        logger.debug(f"{fn.__name__} took {duration * 1000:.1f} ms (queued {wait * 1000:.1f} ms)")
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        slots = asyncio.Semaphore(self.workers)
+        
+        async def hash_one(password):
+            async with slots:
+                return await self._run(hash_password, password, wait=True)
+        
+        return await asyncio.gather(*(hash_one(p) for p in passwords))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+password_hasher = PasswordHasher(PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE)
+
 def create_token(user_id: str, is_admin: bool = False) -> str:
     expiration = datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
     payload = {
@@ -136,25 +759,101 @@ def create_token(user_id: str, is_admin: bool = False) -> str:
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+def create_events_token(user_id: str, session_expires: Optional[float]) -> str:
+    """Short-lived token that only opens /api/events; it carries the session expiry for the stream"""
+    payload = {
+        "sub": user_id,
+        "scope": "events",
+        "session_exp": session_expires,
+        "exp": datetime.now(timezone.utc) + timedelta(seconds=EVENTS_TOKEN_SECONDS)
+    }
+    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+class TTLCache:
+    """LRU cache whose entries also expire after a time-to-live"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return None
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        """Store a value; ttl may only shorten the cache-wide TTL"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+token_cache = TTLCache(AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS)
+user_cache = TTLCache(AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS)
+
+def invalidate_user(user_id: str):
+    """Drop a cached user document; call after any write that changes an existing user.
+
+    The routes only insert users today, and a new id is never cached.
+    Changes made outside the app show up after AUTH_CACHE_TTL_SECONDS.
+    """
+    user_cache.invalidate(user_id)
+
+def decode_token(token: str) -> dict:
+    """Decode a JWT, reusing the claims of tokens seen recently"""
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        # Never keep a token around past its own expiration
+        expires_in = payload.get("exp", 0) - datetime.now(timezone.utc).timestamp()
+        token_cache.set(token, payload, ttl=expires_in)
+    return payload
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
         token = credentials.credentials
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = decode_token(token)
         user_id = payload.get("sub")
         is_admin = payload.get("is_admin", False)
         
-        if not user_id:
+        # Scoped tokens (e.g. the events stream token) never authenticate API calls
+        if not user_id or payload.get("scope"):
             raise HTTPException(status_code=401, detail="Token non valido")
         
         # Check if it's admin token
         if is_admin and user_id == "admin":
             return {"id": "admin", "username": "Admin", "email": ADMIN_EMAIL, "is_admin": True, "created_at": datetime.now(timezone.utc).isoformat()}
         
-        user = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
-        if not user:
-            raise HTTPException(status_code=401, detail="Utente non trovato")
-        user["is_admin"] = False
-        return user
+        user = user_cache.get(user_id)
+        if user is None:
+            user = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
+            if not user:
+                raise HTTPException(status_code=401, detail="Utente non trovato")
+            user["is_admin"] = False
+            user_cache.set(user_id, user)
+        return dict(user)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token scaduto")
     except jwt.InvalidTokenError:
@@ -164,7 +863,7 @@ async def get_admin_user(credentials: HTTPAuthorizationCredentials = Depends(sec
     """Verify user is admin"""
     try:
         token = credentials.credentials
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = decode_token(token)
         is_admin = payload.get("is_admin", False)
         
         if not is_admin:
@@ -176,77 +875,183 @@ async def get_admin_user(credentials: HTTPAuthorizationCredentials = Depends(sec
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Token non valido")
 
+# ============== QUIZ SCORING ==============
+
+# Answer patterns for each profile, in tie-breaking order
+PROFILE_DEFINITIONS = {
+    "cinico": {
+        "answers": {"1a", "2b", "4a", "5d", "6b", "7a", "8b", "9a", "10a"},
+        "name": "Allenatore Cinico",
+        "type": "Tipo Buio",
+        "description": "Stratega diffidente, protegge il cuore dietro l'ironia e il controllo. I suoi Pokémon lo rispettano per la coerenza, non per le parole."
+    },
+    "empatico": {
+        "answers": {"1b", "2a", "3e", "6a", "8a", "9b"},
+        "name": "Allenatore Empatico",
+        "type": "Tipo Folletto",
+        "description": "Guida la squadra con gentilezza. Le creature combattono per legame autentico."
+    },
+    "ansioso": {
+        "answers": {"1c", "2c", "3c", "4c", "5b", "6c", "7b", "8c", "10e"},
+        "name": "Allenatore Ansioso",
+        "type": "Tipo Psico",
+        "description": "Intuitivo e sensibile, ma teme il fallimento. Deve scoprire la propria forza nascosta."
+    },
+    "aggressivo": {
+        "answers": {"1d", "3a", "3d", "5a", "6d", "7d", "8d", "9c", "10c"},
+        "name": "Allenatore Aggressivo",
+        "type": "Tipo Fuoco/Lotta",
+        "description": "Spirito ardente e competitivo. Può diventare grande leader imparando la misura."
+    },
+    "accondiscendente": {
+        "answers": {"1e", "3b", "5e", "6e", "8e", "10d"},
+        "name": "Allenatore Accondiscendente",
+        "type": "Tipo Normale",
+        "description": "Cerca armonia e appartenenza, talvolta dimenticando la propria voce."
+    },
+    "equilibrato": {
+        "answers": {"3e", "5c", "7c", "4b"},
+        "name": "Allenatore Equilibrato",
+        "type": "Tipo Acciaio",
+        "description": "Profilo ideale per l'Accademia: mente lucida, emozioni salde, rispetto per la squadra."
+    }
+}
+
+# Profile used when no answer matches any pattern
+DEFAULT_PROFILE = "equilibrato"
+
+class QuizScorer:
+    """Profile definitions compiled once into bitmasks.
+
+    Every (question, answer) pair used by a profile gets one bit. A profile
+    is the OR of its bits, so scoring a sheet is one AND and popcount per
+    profile. score_many() scores many sheets with a single matrix product.
+    The best score wins, ties go to the earlier profile and a zero score
+    falls back to the default profile.
+    """
+
+    def __init__(self, definitions: dict, default_profile: str):
+        self.keys = list(definitions)
+        self.default_index = self.keys.index(default_profile)
+        
+        self.bits = {}
+        for data in definitions.values():
+            for code in sorted(data["answers"]):
+                self.bits.setdefault((int(code[:-1]), code[-1]), len(self.bits))
+        
+        self.masks = []
+        self.matrix = np.zeros((len(self.bits), len(self.keys)), dtype=np.int16)
+        for column, data in enumerate(definitions.values()):
+            mask = 0
+            for code in data["answers"]:
+                bit = self.bits[(int(code[:-1]), code[-1])]
+                mask |= 1 << bit
+                self.matrix[bit, column] = 1
+            self.masks.append(mask)
+        
+        # Changes whenever the definitions change (answers or texts); stored on every scored response
+        self.version = hashlib.sha1(json.dumps(
+            {key: {**data, "answers": sorted(data["answers"])} for key, data in definitions.items()},
+            sort_keys=True
+        ).encode("utf-8")).hexdigest()[:12]
+
+    def sheet_mask(self, pairs) -> int:
+        mask = 0
+        for pair in pairs:
+            bit = self.bits.get(pair)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def score(self, pairs) -> str:
+        """Profile key for one sheet of (question_number, answer) pairs"""
+        mask = self.sheet_mask(pairs)
+        best_index, best_score = self.default_index, 0
+        for index, profile_mask in enumerate(self.masks):
+            score = (mask & profile_mask).bit_count()
+            if score > best_score:
+                best_index, best_score = index, score
+        return self.keys[best_index]
+
+    def score_many(self, sheets) -> List[str]:
+        """Profile keys for many sheets at once"""
+        rows, columns = [], []
+        for row, pairs in enumerate(sheets):
+            for pair in pairs:
+                bit = self.bits.get(pair)
+                if bit is not None:
+                    rows.append(row)
+                    columns.append(bit)
+        
+        answered = np.zeros((len(sheets), len(self.bits)), dtype=np.int16)
+        answered[rows, columns] = 1
+        scores = answered @ self.matrix
+        best = scores.argmax(axis=1)
+        best[scores.max(axis=1) == 0] = self.default_index
+        return [self.keys[index] for index in best]
+
+quiz_scorer = QuizScorer(PROFILE_DEFINITIONS, DEFAULT_PROFILE)
+
+def answer_pairs(answers) -> List[tuple]:
+    """Normalize QuizAnswer models or stored answer dicts to scorer input"""
+    return [
+        (a["question_number"], a["answer"].lower()) if isinstance(a, dict) else (a.question_number, a.answer.lower())
+        for a in answers
+    ]
+
+def profile_result(profile_key: str) -> QuizResult:
+    profile = PROFILE_DEFINITIONS[profile_key]
+    return QuizResult(
+        profile_name=profile["name"],
+        profile_type=profile["type"],
+        description=profile["description"]
+    )
+
 def calculate_profile(answers: List[QuizAnswer]) -> QuizResult:
     """Calculate personality profile based on answers"""
+    return profile_result(quiz_scorer.score(answer_pairs(answers)))
+
+async def rescore_quiz_responses(force: bool = False, batch_size: int = 1000) -> dict:
+    """Re-score stored quiz responses against the current profile definitions.
+
+    Streams the collection and writes each batch with one unordered
+    bulk_write. Without force only responses scored by an older version of
+    the definitions are touched.
+    """
+    query = {} if force else {"scoring_version": {"$ne": quiz_scorer.version}}
+    cursor = db.quiz_responses.find(query, {"_id": 0, "id": 1, "answers": 1, "profile": 1}).batch_size(batch_size)
+    scanned = changed = 0
     
-    # Define answer patterns for each profile
-    profiles = {
-        "cinico": {
-            "answers": {"1a", "2b", "4a", "5d", "6b", "7a", "8b", "9a", "10a"},
-            "name": "Allenatore Cinico",
-            "type": "Tipo Buio",
-            "description": "Stratega diffidente, protegge il cuore dietro l'ironia e il controllo. I suoi Pokémon lo rispettano per la coerenza, non per le parole."
-        },
-        "empatico": {
-            "answers": {"1b", "2a", "3e", "6a", "8a", "9b"},
-            "name": "Allenatore Empatico",
-            "type": "Tipo Folletto",
-            "description": "Guida la squadra con gentilezza. Le creature combattono per legame autentico."
-        },
-        "ansioso": {
-            "answers": {"1c", "2c", "3c", "4c", "5b", "6c", "7b", "8c", "10e"},
-            "name": "Allenatore Ansioso",
-            "type": "Tipo Psico",
-            "description": "Intuitivo e sensibile, ma teme il fallimento. Deve scoprire la propria forza nascosta."
-        },
-        "aggressivo": {
-            "answers": {"1d", "3a", "3d", "5a", "6d", "7d", "8d", "9c", "10c"},
-            "name": "Allenatore Aggressivo",
-            "type": "Tipo Fuoco/Lotta",
-            "description": "Spirito ardente e competitivo. Può diventare grande leader imparando la misura."
-        },
-        "accondiscendente": {
-            "answers": {"1e", "3b", "5e", "6e", "8e", "10d"},
-            "name": "Allenatore Accondiscendente",
-            "type": "Tipo Normale",
-            "description": "Cerca armonia e appartenenza, talvolta dimenticando la propria voce."
-        },
-        "equilibrato": {
-            "answers": {"3e", "5c", "7c", "4b"},
-            "name": "Allenatore Equilibrato",
-            "type": "Tipo Acciaio",
-            "description": "Profilo ideale per l'Accademia: mente lucida, emozioni salde, rispetto per la squadra."
-        }
-    }
-    
-    # Convert user answers to set
-    user_answers = set()
-    for ans in answers:
-        user_answers.add(f"{ans.question_number}{ans.answer.lower()}")
-    
-    # Calculate match scores
-    best_match = None
-    best_score = 0
-    
-    for profile_key, profile_data in profiles.items():
-        matches = len(user_answers.intersection(profile_data["answers"]))
-        if matches > best_score:
-            best_score = matches
-            best_match = profile_key
+    async def flush(batch):
+        nonlocal changed
+        keys = quiz_scorer.score_many([answer_pairs(doc["answers"]) for doc in batch])
+        operations = []
+        for doc, key in zip(batch, keys):
+            if doc.get("profile") != key:
+                changed += 1
+            operations.append(UpdateOne({"id": doc["id"]}, {"$set": {
+                "profile": key,
+                "result": profile_result(key).model_dump(),
+                "scoring_version": quiz_scorer.version
+            }}))
+        await db.quiz_responses.bulk_write(operations, ordered=False)
     
-    # Default to equilibrato if no clear match
-    if not best_match or best_score == 0:
-        best_match = "equilibrato"
+    batch = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await flush(batch)
+            scanned += len(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+        scanned += len(batch)
     
-    selected_profile = profiles[best_match]
-    return QuizResult(
-        profile_name=selected_profile["name"],
-        profile_type=selected_profile["type"],
-        description=selected_profile["description"]
-    )
+    logger.info(f"Re-scored {scanned} quiz responses ({changed} changed profile), scoring version {quiz_scorer.version}")
+    return {"scanned": scanned, "changed": changed, "scoring_version": quiz_scorer.version}
 
-async def send_quiz_email(user_email: str, username: str, answers: List[QuizAnswer], result: QuizResult):
-    """Send quiz results via email"""
+def build_quiz_email(user_email: str, username: str, answers: List[QuizAnswer], result: QuizResult) -> dict:
+    """Build the quiz results email for the outbox"""
     
     # Format answers for email
     answers_text = ""
@@ -281,46 +1086,1111 @@ async def send_quiz_email(user_email: str, username: str, answers: List[QuizAnsw
     </div>
     """
     
-    params = {
+    return {
         "from": SENDER_EMAIL,
         "to": [RECIPIENT_EMAIL],
         "subject": f"Risultato Questionario - {username} - {result.profile_name}",
         "html": html_content
     }
+
+# ============== EMAIL OUTBOX ==============
+
+class ResendTransport:
+    """Delivers outbox messages through the Resend API"""
+
+    async def send(self, message: dict):
+        return await asyncio.to_thread(resend.Emails.send, message)
+
+class SmtpTransport:
+    """Delivers outbox messages to an SMTP server (e.g. a local debugging server)"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+
+    def _send(self, message: dict):
+        email = EmailMessage()
+        email["From"] = message["from"]
+        email["To"] = ", ".join(message["to"])
+        email["Subject"] = message["subject"]
+        email.set_content("Questa email richiede un client con supporto HTML.")
+        email.add_alternative(message["html"], subtype="html")
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            smtp.send_message(email)
+
+    async def send(self, message: dict):
+        await asyncio.to_thread(self._send, message)
+
+class FileTransport:
+    """Writes outbox messages to a directory instead of sending them (for local testing)"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    def _write(self, message: dict):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}.json"
+        path.write_text(json.dumps(message, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    async def send(self, message: dict):
+        await asyncio.to_thread(self._write, message)
+
+def create_email_transport(name: str):
+    if name == "smtp":
+        return SmtpTransport(SMTP_HOST, SMTP_PORT)
+    if name == "file":
+        return FileTransport(EMAIL_FILE_DIR)
+    return ResendTransport()
+
+class EmailOutbox:
+    """Durable email queue stored in the email_outbox collection.
+
+    enqueue() only persists the message. A background worker claims pending
+    messages in batches, sends them with bounded concurrency and retries
+    failures with exponential backoff until they are marked dead. Sent
+    messages get a sent_at date and expire after EMAIL_OUTBOX_RETENTION_DAYS.
+    """
+
+    def __init__(self, transport, batch_size: int, concurrency: int, max_attempts: int,
+                 backoff_seconds: float, poll_seconds: float):
+        self.transport = transport
+        self.batch_size = batch_size
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.poll_seconds = poll_seconds
+        self.sent = 0
+        self.failed = 0
+        self.dead = 0
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def enqueue(self, message: dict) -> str:
+        now = datetime.now(timezone.utc).isoformat()
+        outbox_doc = {
+            "id": str(uuid.uuid4()),
+            "message": message,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now
+        }
+        await db.email_outbox.insert_one(outbox_doc)
+        self._wakeup.set()
+        return outbox_doc["id"]
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Email outbox worker failed")
+                processed = 0
+            
+            if processed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def _claim_batch(self) -> List[dict]:
+        now = datetime.now(timezone.utc)
+        # "sending" entries whose lease ran out belong to a worker that died mid-send
+        due = {"status": {"$in": ["pending", "sending"]}, "next_attempt_at": {"$lte": now.isoformat()}}
+        candidates = await db.email_outbox.find(due, {"_id": 0, "id": 1}) \
+            .sort("next_attempt_at", ASCENDING).limit(self.batch_size).to_list(self.batch_size)
+        if not candidates:
+            return []
+        
+        claim_id = str(uuid.uuid4())
+        lease_until = (now + timedelta(seconds=EMAIL_OUTBOX_LEASE_SECONDS)).isoformat()
+        await db.email_outbox.update_many(
+            {**due, "id": {"$in": [c["id"] for c in candidates]}},
+            {"$set": {"status": "sending", "claim_id": claim_id, "next_attempt_at": lease_until},
+             "$inc": {"attempts": 1}}
+        )
+        return await db.email_outbox.find({"claim_id": claim_id}, {"_id": 0}).to_list(self.batch_size)
+
+    async def drain_once(self) -> int:
+        """Claim and send one batch; returns how many messages were claimed"""
+        batch = await self._claim_batch()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def deliver(entry):
+            async with semaphore:
+                await self._deliver(entry)
+        
+        await asyncio.gather(*(deliver(entry) for entry in batch))
+        return len(batch)
+
+    async def _deliver(self, entry: dict):
+        try:
+            await self.transport.send(entry["message"])
+        except Exception as e:
+            await self._record_failure(entry, e)
+            return
+        
+        self.sent += 1
+        await db.email_outbox.update_one(
+            {"id": entry["id"], "claim_id": entry["claim_id"]},
+            {"$set": {"status": "sent", "sent_at": datetime.now(timezone.utc)},  # a date, for the TTL index
+             "$unset": {"claim_id": ""}}
+        )
+        logger.info(f"Email {entry['id']} sent: {entry['message']['subject']}")
+
+    async def _record_failure(self, entry: dict, error: Exception):
+        self.failed += 1
+        attempts = entry["attempts"]
+        update = {"last_error": str(error)}
+        if attempts >= self.max_attempts:
+            self.dead += 1
+            update["status"] = "dead"
+            logger.error(f"Email {entry['id']} dead-lettered after {attempts} attempts: {error}")
+        else:
+            delay = min(self.backoff_seconds * 2 ** (attempts - 1), 3600)
+            update["status"] = "pending"
+            update["next_attempt_at"] = (datetime.now(timezone.utc) + timedelta(seconds=delay)).isoformat()
+            logger.warning(f"Email {entry['id']} failed (attempt {attempts}), retrying in {delay:.0f}s: {error}")
+        
+        await db.email_outbox.update_one(
+            {"id": entry["id"], "claim_id": entry["claim_id"]},
+            {"$set": update, "$unset": {"claim_id": ""}}
+        )
+
+email_outbox = EmailOutbox(
+    create_email_transport(EMAIL_TRANSPORT),
+    batch_size=EMAIL_OUTBOX_BATCH_SIZE,
+    concurrency=EMAIL_OUTBOX_CONCURRENCY,
+    max_attempts=EMAIL_OUTBOX_MAX_ATTEMPTS,
+    backoff_seconds=EMAIL_OUTBOX_BACKOFF_SECONDS,
+    poll_seconds=EMAIL_OUTBOX_POLL_SECONDS
+)
+
+# ============== QUIZ STATISTICS ==============
+
+# Answers become field names, so only plain ASCII letters/digits are counted
+# (the same pattern filters the incremental updates and the rebuild)
+STATS_ANSWER_PATTERN = "^[A-Za-z0-9]+$"
+stats_answer_re = re.compile(STATS_ANSWER_PATTERN)
+
+def quiz_stats_update(quiz_doc: dict) -> List[UpdateOne]:
+    """$inc operations that add one quiz response to the quiz_stats rollups"""
+    increments = {"submissions": 1, f"profiles.{quiz_doc['profile']}": 1}
+    for answer in quiz_doc["answers"]:
+        if stats_answer_re.match(answer["answer"]):
+            key = f"answers.{answer['question_number']}.{answer['answer'].lower()}"
+            increments[key] = increments.get(key, 0) + 1
     
+    day = quiz_doc["submitted_at"][:10]
+    return [
+        UpdateOne({"_id": "totals"}, {"$inc": increments}, upsert=True),
+        UpdateOne({"_id": f"day:{day}"}, {"$set": {"date": day}, "$inc": {"submissions": 1}}, upsert=True)
+    ]
+
+async def record_quiz_stats(quiz_doc: dict):
+    """Update the rollups for a stored quiz.
+
+    Failures are logged, not raised: the quiz is already saved and the
+    rollups can be repaired with /admin/stats/rebuild.
+    """
     try:
-        email = await asyncio.to_thread(resend.Emails.send, params)
-        logger.info(f"Email sent successfully: {email}")
-        return True
-    except Exception as e:
-        logger.error(f"Failed to send email: {str(e)}")
+        await db.quiz_stats.bulk_write(quiz_stats_update(quiz_doc), ordered=False)
+    except PyMongoError:
+        logger.exception(f"Could not update quiz stats for {quiz_doc['id']}, run /admin/stats/rebuild")
+
+async def backfill_quiz_profiles(batch_size: int = 1000) -> int:
+    """Set profile on responses stored before the field existed.
+
+    The key comes from the stored result name, or from the answers when
+    the name no longer matches a profile.
+    """
+    keys_by_name = {data["name"]: key for key, data in PROFILE_DEFINITIONS.items()}
+    cursor = db.quiz_responses.find(
+        {"profile": {"$exists": False}},
+        {"_id": 0, "id": 1, "answers": 1, "result.profile_name": 1}
+    ).batch_size(batch_size)
+    backfilled = 0
+    
+    async def flush(batch):
+        scored = quiz_scorer.score_many([answer_pairs(doc["answers"]) for doc in batch])
+        operations = [
+            UpdateOne({"id": doc["id"], "profile": {"$exists": False}}, {"$set": {
+                "profile": keys_by_name.get((doc.get("result") or {}).get("profile_name"), key)
+            }})
+            for doc, key in zip(batch, scored)
+        ]
+        await db.quiz_responses.bulk_write(operations, ordered=False)
+    
+    batch = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await flush(batch)
+            backfilled += len(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+        backfilled += len(batch)
+    if backfilled:
+        logger.info(f"Backfilled the profile of {backfilled} quiz responses")
+    return backfilled
+
+async def rebuild_quiz_stats() -> dict:
+    """Recompute every rollup from quiz_responses (repair path)"""
+    await backfill_quiz_profiles()
+    facets = await db.quiz_responses.aggregate([
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "profiles": [
+                {"$match": {"profile": {"$type": "string"}}},
+                {"$group": {"_id": "$profile", "count": {"$sum": 1}}}
+            ],
+            "answers": [
+                {"$unwind": "$answers"},
+                {"$match": {"answers.answer": {"$regex": STATS_ANSWER_PATTERN}}},
+                {"$project": {"question": "$answers.question_number", "answer": {"$toLower": "$answers.answer"}}},
+                {"$group": {"_id": {"question": "$question", "answer": "$answer"}, "count": {"$sum": 1}}}
+            ],
+            "daily": [
+                {"$group": {"_id": {"$substrBytes": ["$submitted_at", 0, 10]}, "count": {"$sum": 1}}}
+            ]
+        }}
+    ]).to_list(1)
+    facets = facets[0]
+    
+    totals = {
+        "_id": "totals",
+        "submissions": facets["total"][0]["count"] if facets["total"] else 0,
+        "profiles": {row["_id"]: row["count"] for row in facets["profiles"]},
+        "answers": {},
+        "rebuilt_at": datetime.now(timezone.utc).isoformat()
+    }
+    for row in facets["answers"]:
+        totals["answers"].setdefault(str(row["_id"]["question"]), {})[row["_id"]["answer"]] = row["count"]
+    
+    day_ids = [f"day:{row['_id']}" for row in facets["daily"]]
+    operations = [ReplaceOne({"_id": "totals"}, totals, upsert=True)]
+    operations += [
+        ReplaceOne({"_id": f"day:{row['_id']}"}, {"date": row["_id"], "submissions": row["count"]}, upsert=True)
+        for row in facets["daily"]
+    ]
+    operations.append(DeleteMany({"_id": {"$regex": "^day:", "$nin": day_ids}}))
+    await db.quiz_stats.bulk_write(operations, ordered=False)
+    
+    logger.info(f"Rebuilt quiz statistics from {totals['submissions']} responses")
+    return {"submissions": totals["submissions"], "days": len(day_ids)}
+
+async def ensure_quiz_stats():
+    """Startup: backfill missing profiles, then build the rollups once on deploy.
+
+    Until the first rebuild the rollups only hold quizzes submitted since;
+    the export's profile filter relies on every response having a profile.
+    """
+    try:
+        backfilled = await backfill_quiz_profiles()
+        totals = await db.quiz_stats.find_one({"_id": "totals"}, {"_id": 0, "rebuilt_at": 1})
+        if backfilled or not totals or "rebuilt_at" not in totals:
+            await rebuild_quiz_stats()
+    except PyMongoError:
+        logger.exception("Could not build the quiz statistics, run /admin/stats/rebuild")
+
+# ============== PAGINATION ==============
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        values = None
+    # Only plain sort values: a dict or list would be read as a query operator
+    if not isinstance(values, list) or len(values) != size or \
+            not all(value is None or isinstance(value, (str, int, float)) for value in values):
+        raise HTTPException(status_code=400, detail="Cursore non valido")
+    return values
+
+async def fetch_page(collection, query: dict, sort_fields: List[str], limit: int,
+                     cursor: Optional[str] = None, projection: Optional[dict] = None,
+                     collation: Optional[dict] = None, stages: Optional[List[dict]] = None) -> tuple:
+    """Keyset pagination over an ascending compound sort, returning (items, next cursor).
+
+    sort_fields must end with a unique field and be backed by an index
+    (equality fields of the query first). The next cursor is None on the
+    last page. A collation must match the one of the index backing the sort.
+    Extra aggregation stages run on the page only, after the limit, and
+    must keep the sort fields.
+    """
+    if cursor:
+        values = decode_cursor(cursor, len(sort_fields))
+        # (a > va) or (a == va and b > vb) or ...
+        after = []
+        for position, field in enumerate(sort_fields):
+            clause = dict(zip(sort_fields[:position], values[:position]))
+            clause[field] = {"$gt": values[position]}
+            after.append(clause)
+        query = {"$and": [query, {"$or": after}]}
+    
+    sort = [(field, ASCENDING) for field in sort_fields]
+    if stages:
+        pipeline = [{"$match": query}, {"$sort": dict(sort)}, {"$limit": limit + 1}]
+        if projection:
+            pipeline.append({"$project": projection})
+        options = {"collation": collation} if collation else {}
+        items = await collection.aggregate(pipeline + stages, **options).to_list(limit + 1)
+    else:
+        items = await collection.find(query, projection, collation=collation) \
+            .sort(sort).limit(limit + 1).to_list(limit + 1)
+    if len(items) > limit:
+        items = items[:limit]
+        return items, encode_cursor([items[-1].get(field) for field in sort_fields])
+    return items, None
+
+async def paginate(collection, query: dict, sort_fields: List[str], response: Response,
+                   limit: int, cursor: Optional[str] = None, projection: Optional[dict] = None,
+                   collation: Optional[dict] = None, stages: Optional[List[dict]] = None) -> List[dict]:
+    """fetch_page for list routes: the next cursor goes in the X-Next-Cursor header"""
+    items, next_cursor = await fetch_page(collection, query, sort_fields, limit, cursor, projection, collation, stages)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+def dump_json(content) -> bytes:
+    """Compact UTF-8 JSON, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dump_json(content)
+
+def list_response(items: List[dict], response: Response):
+    """Return documents read from Mongo, bypassing FastAPI's re-serialization when enabled.
+
+    The documents were validated when they were written, so with
+    FAST_JSON_RESPONSES they are encoded as-is instead of being validated
+    against the response model and passed through jsonable_encoder.
+    """
+    if not FAST_JSON_RESPONSES:
+        return items
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    return FastJSONResponse(items, headers=headers)
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match header lists etag"""
+    header = request.headers.get("if-none-match")
+    if not header:
         return False
+    if header.strip() == "*":
+        return True
+    return etag in (candidate.strip().removeprefix("W/") for candidate in header.split(","))
+
+# ============== NEWS FEED CACHE ==============
+
+async def load_active_news() -> List[dict]:
+    news = await db.news.find({"is_active": True}, {"_id": 0}).to_list(100)
+    
+    # If no news exist, create default questionnaire news
+    if not news:
+        default_news = {
+            "id": str(uuid.uuid4()),
+            "title": "Questionario sulla Personalità",
+            "description": "Scopri quale tipo di allenatore sei! Completa il questionario della Commissione dell'Accademia per ricevere la tua valutazione ufficiale.",
+            "news_type": "questionnaire",
+            "is_active": True,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "size": "hero"
+        }
+        await db.news.insert_one(default_news)
+        default_news.pop("_id", None)
+        news = [default_news]
+    
+    return news
+
+class NewsFeedCache:
+    """Serialized active-news feed keyed by a version number.
+
+    Every write to the news collection calls bump(). Reads rebuild the feed
+    (query, validation and serialization) only when the version moved or
+    the TTL ran out, and otherwise return the stored bytes and ETag.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entry = None  # (version, expires_at, body, etag)
+        self._lock = asyncio.Lock()
+
+    def bump(self):
+        self.version += 1
+        self._entry = None
+
+    def _fresh(self):
+        entry = self._entry
+        if entry and entry[0] == self.version and entry[1] > time.monotonic():
+            return entry[2], entry[3]
+        return None
+
+    async def get(self):
+        """Return (body, etag) for the current feed"""
+        cached = self._fresh()
+        if cached:
+            self.hits += 1
+            return cached
+        
+        # Only one request rebuilds the feed; the others wait for its result
+        async with self._lock:
+            cached = self._fresh()
+            if cached:
+                self.hits += 1
+                return cached
+            
+            self.misses += 1
+            version = self.version
+            news = [NewsItem(**item).model_dump() for item in await load_active_news()]
+            body = dump_json(news)
+            etag = f'"news-{hashlib.sha1(body).hexdigest()[:16]}"'
+            if version == self.version:
+                self._entry = (version, time.monotonic() + self.ttl, body, etag)
+            return body, etag
+
+news_cache = NewsFeedCache(NEWS_CACHE_TTL_SECONDS)
+
+# ============== POKEMON CATALOG ==============
+
+class PokemonSearchIndex:
+    """Name search over the catalog, including localized species names.
+
+    Names are normalized (lowercase, accents and punctuation removed). A
+    trie answers prefix queries from the best names precomputed at each
+    node (the prefix's bigrams find the rest when a node has more); a
+    bigram index finds substring and misspelled candidates, which are then
+    checked by edit distance against the start of each name. Ranking:
+    exact, prefix, substring, fuzzy; English names before localized ones,
+    then shorter names.
+    """
+
+    NODE_RESULTS = SEARCH_MAX_RESULTS
+    FUZZY_CANDIDATES = 200
+
+    def __init__(self, entries: List[dict]):
+        self.entries = entries
+        self.terms = []  # (normalized name, entry index, display name, language)
+        seen = set()
+        for index, entry in enumerate(entries):
+            names = [("en", entry["name"])] + sorted((entry.get("names") or {}).items())
+            for language, name in names:
+                term = self.normalize(name)
+                if term and (term, index) not in seen:
+                    seen.add((term, index))
+                    self.terms.append((term, index, name, language))
+        
+        self.trie = {}
+        self.grams = {}
+        by_quality = sorted(range(len(self.terms)), key=self._term_order)
+        for term_id in by_quality:
+            term = self.terms[term_id][0]
+            node = self.trie
+            for char in term:
+                node = node.setdefault(char, {})
+                top = node.setdefault("", [])
+                if len(top) < self.NODE_RESULTS:
+                    top.append(term_id)
+            for gram in self.bigrams(term):
+                self.grams.setdefault(gram, []).append(term_id)
+
+    def _term_order(self, term_id: int):
+        term, index, _, language = self.terms[term_id]
+        return (language != "en", len(term), self.entries[index]["id"])
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        decomposed = unicodedata.normalize("NFKD", text.casefold())
+        return "".join(c for c in decomposed if c.isalnum())
+
+    @staticmethod
+    def bigrams(term: str) -> set:
+        padded = f"^{term}"
+        return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+    @staticmethod
+    def prefix_distance(query: str, term: str, limit: int) -> int:
+        """Edit distance from query to the closest prefix of term (limit + 1 if above limit)"""
+        term = term[:len(query) + limit]
+        previous = list(range(len(term) + 1))
+        for i, char in enumerate(query, start=1):
+            current = [i]
+            for j, other in enumerate(term, start=1):
+                current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+            if min(current) > limit:
+                return limit + 1
+            previous = current
+        return min(previous)
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        q = self.normalize(query)
+        if not q:
+            return []
+        
+        # rank tuple per entry index; lower is better
+        best = {}
+        
+        def consider(term_id: int, kind: int, distance: int = 0):
+            term, index, name, language = self.terms[term_id]
+            rank = (kind, distance, language != "en", len(term), self.entries[index]["id"])
+            if index not in best or rank < best[index][0]:
+                best[index] = (rank, name, language)
+        
+        node = self.trie
+        for char in q:
+            node = node.get(char)
+            if node is None:
+                break
+        else:
+            top = node.get("", [])
+            for term_id in top:
+                consider(term_id, 0 if self.terms[term_id][0] == q else 1)
+            if len(best) < limit and len(top) == self.NODE_RESULTS:
+                # Several names of one entry can fill the node; look up every name starting with q
+                postings = sorted((self.grams.get(gram, ()) for gram in self.bigrams(q)), key=len)
+                for term_id in set(postings[0]).intersection(*postings[1:]):
+                    if self.terms[term_id][0].startswith(q):
+                        consider(term_id, 0 if self.terms[term_id][0] == q else 1)
+        
+        if len(best) < limit and len(q) >= 2:
+            # Substring: only terms holding every bigram of the query can contain it
+            postings = sorted((self.grams.get(q[i:i + 2], ()) for i in range(len(q) - 1)), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+            for term_id in candidates:
+                if q in self.terms[term_id][0]:
+                    consider(term_id, 2)
+        
+        if len(best) < limit and len(q) >= 4:
+            max_distance = 1 if len(q) <= 5 else 2
+            grams = self.bigrams(q)
+            # Each edit breaks at most two bigrams, so closer terms share at least this many
+            min_shared = max(1, len(grams) - 2 * max_distance)
+            shared = TallyCounter(chain.from_iterable(self.grams.get(gram, ()) for gram in grams))
+            for term_id, count in shared.most_common(self.FUZZY_CANDIDATES):
+                if count < min_shared:
+                    break
+                distance = self.prefix_distance(q, self.terms[term_id][0], max_distance)
+                if distance <= max_distance:
+                    consider(term_id, 3, distance)
+        
+        kinds = ("exact", "prefix", "substring", "fuzzy")
+        results = []
+        for index, (rank, name, language) in sorted(best.items(), key=lambda item: item[1][0])[:limit]:
+            entry = self.entries[index]
+            results.append({
+                "id": entry["id"],
+                "name": entry["name"],
+                "types": entry.get("types", []),
+                "sprite": entry.get("sprite"),
+                "matched_name": name,
+                "language": language,
+                "match": kinds[rank[0]]
+            })
+        return results
+
+class PokemonCatalog:
+    """In-memory snapshot of the imported pokemon_catalog collection.
+
+    The catalog only changes when import_pokedex.py runs, so pages are
+    serialized once and served from memory with a version-based ETag.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.details_version = None
+        self.entries = []
+        self.search_index = PokemonSearchIndex([])
+        self._pages = TTLCache(256, float("inf"))
+
+    async def load(self):
+        meta = await db.catalog_meta.find_one({"_id": "pokemon_catalog"})
+        details_meta = await db.catalog_meta.find_one({"_id": "pokemon_details"})
+        entries = await db.pokemon_catalog.find({}, {"_id": 0}).sort("id", ASCENDING).to_list(None)
+        self.entries = entries
+        self.version = meta["version"] if meta else None
+        self.details_version = details_meta["version"] if details_meta else None
+        self.search_index = PokemonSearchIndex(entries)
+        self._pages.clear()
+        if entries:
+            logger.info(f"Pokemon catalog loaded: {len(entries)} entries (version {self.version})")
+        else:
+            logger.warning("Pokemon catalog is empty, run import_pokedex.py to import a PokeAPI dump")
+
+    def page(self, offset: int, limit: int, fields: Optional[tuple] = None):
+        """Return (body, etag) for a slice of the catalog"""
+        key = (offset, limit, fields)
+        cached = self._pages.get(key)
+        if cached is not None:
+            return cached
+        
+        results = self.entries[offset:offset + limit]
+        if fields:
+            results = [{field: entry.get(field) for field in fields} for entry in results]
+        body = dump_json({"count": len(self.entries), "offset": offset, "limit": limit, "results": results})
+        etag = f'"{self.version}-{hashlib.sha1(body).hexdigest()[:16]}"'
+        self._pages.set(key, (body, etag))
+        return body, etag
+
+pokemon_catalog = PokemonCatalog()
+
+# ============== QUIZ PDF ==============
+
+# Bump whenever render_quiz_pdf changes its output; it is part of every cache key
+QUIZ_PDF_TEMPLATE_VERSION = "1"
+
+def pdf_text(value: str) -> str:
+    """Escape text for a PDF string literal in WinAnsi (cp1252) encoding"""
+    text = value.encode("cp1252", errors="replace").decode("latin-1")
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+def render_quiz_pdf(quiz: dict) -> bytes:
+    """Render a one-page A4 results sheet with the standard Helvetica fonts.
+
+    Pure function of the quiz document so it can run in a worker process and
+    produce identical bytes for identical input.
+    """
+    result = quiz.get("result") or {}
+    submitted_at = quiz.get("submitted_at", "")
+    try:
+        date = datetime.fromisoformat(submitted_at).strftime('%d/%m/%Y %H:%M')
+    except ValueError:
+        date = submitted_at
+    
+    # (font, size, text, gap before the line)
+    lines = [
+        ("F2", 22, "Risultati del Questionario", 0),
+        ("F1", 14, "Accademia Pokémon", 10),
+        ("F2", 11, "Allenatore: " + quiz.get("username", ""), 34),
+        ("F2", 11, "Email: " + quiz.get("email", ""), 6),
+        ("F2", 11, "Data: " + date, 6),
+        ("F2", 13, "Risposte:", 24),
+    ]
+    for answer in sorted(quiz.get("answers", []), key=lambda a: a["question_number"]):
+        lines.append(("F1", 11, f"Domanda {answer['question_number']} - Risposta {str(answer['answer']).upper()}", 4))
+    lines.append(("F2", 18, result.get("profile_name", ""), 30))
+    lines.append(("F1", 13, result.get("profile_type", ""), 8))
+    for index, row in enumerate(textwrap.wrap(result.get("description", ""), 80)):
+        lines.append(("F1", 11, row, 14 if index == 0 else 3))
+    lines.append(("F1", 9, "Documento ufficiale dell'Accademia Pokémon", 40))
+    
+    ops = ["0.831 0.686 0.216 RG 3 w 28 28 539 786 re S 1 w 36 36 523 770 re S", "0.173 0.243 0.314 rg"]
+    y = 770
+    for font, size, text, gap in lines:
+        y -= size + gap
+        ops.append(f"BT /{font} {size} Tf 60 {y} Td {pdf_text(text)} Tj ET")
+    content = "\n".join(ops).encode("latin-1")
+    
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R /F2 6 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    pdf = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(pdf)
+
+class QuizPdfCache:
+    """Renders quiz PDFs off the event loop and keeps them on disk.
+
+    Files are named after a hash of the quiz document and the template
+    version, so a cached file never goes stale and can double as the ETag.
+    Hits refresh the file time; past max_files the oldest files are removed.
+    """
+
+    def __init__(self, directory: Path, workers: int, max_files: int):
+        self.directory = directory
+        self.workers = max(1, workers)
+        self.max_files = max(1, max_files)
+        self.rendered = 0
+        self.hits = 0
+        self._executor = None
+
+    def key(self, quiz: dict) -> str:
+        payload = json.dumps(quiz, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(f"{QUIZ_PDF_TEMPLATE_VERSION}:{payload}".encode("utf-8")).hexdigest()
+
+    def _write(self, path: Path, data: bytes):
+        # Write-then-rename so concurrent readers never see a partial file
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        self._prune()
+
+    def _prune(self):
+        files = []
+        for path in self.directory.glob("*.pdf"):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                pass
+        if len(files) <= self.max_files:
+            return
+        files.sort()
+        for _, path in files[:len(files) - self.max_files]:
+            path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _read(path: Path) -> bytes:
+        data = path.read_bytes()
+        os.utime(path)
+        return data
+
+    async def _render(self, quiz: dict) -> bytes:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        executor = self._executor
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, render_quiz_pdf, quiz)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM killed); the pool is unusable, start a new one next time
+            if self._executor is executor:
+                self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    async def get(self, quiz: dict, key: str) -> bytes:
+        path = self.directory / f"{key}.pdf"
+        try:
+            data = await asyncio.to_thread(self._read, path)
+            self.hits += 1
+            return data
+        except FileNotFoundError:
+            pass
+        
+        try:
+            data = await self._render(quiz)
+        except BrokenProcessPool:
+            logger.warning("Quiz PDF worker pool broke, retrying on a new pool")
+            data = await self._render(quiz)
+        await asyncio.to_thread(self._write, path, data)
+        self.rendered += 1
+        return data
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+quiz_pdf_cache = QuizPdfCache(QUIZ_PDF_DIR, QUIZ_PDF_WORKERS, QUIZ_PDF_CACHE_MAX_FILES)
+
+# ============== RATE LIMITING ==============
+
+rate_limit_blocked = metrics.register(Counter(
+    "rate_limit_blocked_total", "Requests rejected by the login/registration rate limiter", ("route", "limit")))
+
+class MemoryRateLimitBackend:
+    """Per-process limiter state; each worker enforces its own limits"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._windows = OrderedDict()
+
+    def _touch(self, table: OrderedDict, key, value):
+        table[key] = value
+        table.move_to_end(key)
+        while len(table) > self.max_keys:
+            table.popitem(last=False)
+
+    async def take_token(self, key: str, capacity: int, rate: float, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        self._touch(self._buckets, key, (tokens - 1 if allowed else tokens, now))
+        return 0.0 if allowed else (1 - tokens) / rate
+
+    async def window_counts(self, key: str, window: int, now: float) -> tuple:
+        index = int(now // window)
+        current = self._windows.get((key, index), 0) + 1
+        self._touch(self._windows, (key, index), current)
+        return self._windows.get((key, index - 1), 0), current
+
+class MongoRateLimitBackend:
+    """Limiter state shared by every worker through the rate_limits collection"""
+
+    async def take_token(self, key: str, capacity: int, rate: float, now: float) -> float:
+        refilled = {"$min": [capacity, {"$add": [
+            {"$ifNull": ["$tokens", capacity]},
+            {"$multiply": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, rate]}
+        ]}]}
+        doc = await db.rate_limits.find_one_and_update(
+            {"_id": f"bucket:{key}"},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "expires_at": datetime.fromtimestamp(now + capacity / rate, timezone.utc)
+                }}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return 0.0 if doc["allowed"] else (1 - doc["tokens"]) / rate
+
+    async def window_counts(self, key: str, window: int, now: float) -> tuple:
+        index = int(now // window)
+        doc = await db.rate_limits.find_one_and_update(
+            {"_id": f"window:{key}:{index}"},
+            {"$inc": {"count": 1}, "$setOnInsert": {"expires_at": datetime.fromtimestamp((index + 2) * window, timezone.utc)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        previous = await db.rate_limits.find_one({"_id": f"window:{key}:{index - 1}"})
+        return (previous or {}).get("count", 0), doc["count"]
+
+class RateLimiter:
+    """Admission control in front of bcrypt for login and registration.
+
+    Each client IP has a token bucket (bursts of RATE_LIMIT_IP_BURST,
+    refilled at RATE_LIMIT_IP_PER_MINUTE). Each account has a sliding
+    window of RATE_LIMIT_ACCOUNT_ATTEMPTS, estimated from the current and
+    previous fixed windows. Backend errors fail open.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def client_ip(self, request: Request) -> str:
+        if RATE_LIMIT_TRUST_FORWARDED_FOR:
+            forwarded = request.headers.get("x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        return request.client.host if request.client else "unknown"
+
+    async def _retry_after(self, route: str, ip: str, account: Optional[str]) -> tuple:
+        now = time.time()
+        wait = await self.backend.take_token(
+            f"{route}:ip:{ip}", RATE_LIMIT_IP_BURST, RATE_LIMIT_IP_PER_MINUTE / 60, now)
+        if wait:
+            return "ip", wait
+        if account:
+            window = RATE_LIMIT_ACCOUNT_WINDOW_SECONDS
+            previous, current = await self.backend.window_counts(f"{route}:account:{account.lower()}", window, now)
+            elapsed = now % window
+            if previous * (1 - elapsed / window) + current > RATE_LIMIT_ACCOUNT_ATTEMPTS:
+                return "account", window - elapsed
+        return None, 0
+
+    async def check(self, request: Request, route: str, account: Optional[str] = None):
+        """Raise 429 if this attempt is over the IP or account limit"""
+        if self.backend is None:
+            return
+        try:
+            limit, wait = await self._retry_after(route, self.client_ip(request), account)
+        except Exception:
+            logger.exception("Rate limiter unavailable, allowing request")
+            return
+        if limit:
+            rate_limit_blocked.inc(route=route, limit=limit)
+            raise HTTPException(
+                status_code=429,
+                detail="Troppi tentativi, riprova più tardi",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))}
+            )
+
+def create_rate_limit_backend():
+    if RATE_LIMIT_BACKEND == "off":
+        return None
+    if RATE_LIMIT_BACKEND == "mongo":
+        return MongoRateLimitBackend()
+    return MemoryRateLimitBackend()
+
+rate_limiter = RateLimiter(create_rate_limit_backend())
+
+# ============== EVENTS ==============
+
+class EventSubscription:
+    def __init__(self, channels: List[str], queue_size: int):
+        self.channels = channels
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+class EventBroker:
+    """In-process pub/sub feeding the /api/events streams.
+
+    Every connection listens on "broadcast" and on its own "user:<id>"
+    channel. Messages are serialized once per publish. A connection whose
+    queue fills up is marked overflowed and told to reconnect, so one slow
+    client never holds back the others.
+
+    With EVENTS_SOURCE=local the write routes publish directly, which only
+    reaches clients of the same worker. With EVENTS_SOURCE=changestream a
+    MongoDB change stream on news and user_pokemon feeds every worker and
+    the routes' notify() calls are ignored.
+    """
+
+    def __init__(self, source: str, queue_size: int):
+        self.source = source
+        self.queue_size = queue_size
+        self.published = 0
+        self.dropped = 0
+        self._channels = {}
+        self._subscriptions = set()
+        self._next_id = 0
+        self._task = None
+
+    @property
+    def connections(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self, channels: List[str]) -> EventSubscription:
+        subscription = EventSubscription(channels, self.queue_size)
+        self._subscriptions.add(subscription)
+        for channel in channels:
+            self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: EventSubscription):
+        self._subscriptions.discard(subscription)
+        for channel in subscription.channels:
+            listeners = self._channels.get(channel)
+            if listeners is not None:
+                listeners.discard(subscription)
+                if not listeners:
+                    del self._channels[channel]
+
+    def publish(self, channel: str, event: str, data: dict):
+        listeners = self._channels.get(channel)
+        self.published += 1
+        if not listeners:
+            return
+        self._next_id += 1
+        message = b"id: %d\nevent: %s\ndata: %s\n\n" % (self._next_id, event.encode("ascii"), dump_json(data))
+        for subscription in listeners:
+            if subscription.overflowed:
+                continue
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+                self.dropped += 1
+
+    def notify(self, channel: str, event: str, data: dict):
+        """Publish from a write route (no-op when the change stream is the source)"""
+        if self.source == "local":
+            self.publish(channel, event, data)
+
+    async def start(self):
+        if self.source != "changestream":
+            return
+        for name in ("news", "user_pokemon"):
+            # Pre-images give delete events the removed document (MongoDB 6.0+)
+            try:
+                await db.command("collMod", name, changeStreamPreAndPostImages={"enabled": True})
+            except OperationFailure as e:
+                logger.warning(f"Change stream pre-images unavailable for {name}: {e}")
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": ["news", "user_pokemon"]}}}]
+        resume_token = None
+        while True:
+            try:
+                async with db.watch(
+                    pipeline,
+                    full_document="updateLookup",
+                    full_document_before_change="whenAvailable",
+                    resume_after=resume_token
+                ) as stream:
+                    logger.info("Events change stream started")
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        self.publish_change(change)
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                logger.error(f"Events change stream failed, retrying in 5s: {e}")
+                await asyncio.sleep(5)
+
+    def publish_change(self, change: dict):
+        operation = change["operationType"]
+        document = dict(change.get("fullDocument") or change.get("fullDocumentBeforeChange") or {})
+        document.pop("_id", None)
+        if change["ns"]["coll"] == "news":
+            action = {"insert": "created", "update": "updated", "replace": "updated", "delete": "deleted"}.get(operation)
+            if action:
+                self.publish("broadcast", "news", {"action": action, "news": document})
+        elif document.get("user_id"):
+            action = {"insert": "assigned", "delete": "removed"}.get(operation)
+            if action:
+                self.publish(f"user:{document['user_id']}", "pokemon", {"action": action, "pokemon": document})
+
+event_broker = EventBroker(EVENTS_SOURCE, EVENTS_QUEUE_SIZE)
 
 # ============== AUTH ROUTES ==============
 
 @api_router.post("/auth/register", response_model=TokenResponse)
-async def register(user_data: UserCreate):
-    # Check if email exists
-    existing = await db.users.find_one({"email": user_data.email}, {"_id": 0})
-    if existing:
-        raise HTTPException(status_code=400, detail="Email già registrata")
+async def register(user_data: UserCreate, request: Request):
+    await rate_limiter.check(request, "register", user_data.email)
     
-    # Check if username exists
-    existing_username = await db.users.find_one({"username": user_data.username}, {"_id": 0})
-    if existing_username:
-        raise HTTPException(status_code=400, detail="Username già in uso")
-    
-    # Create user
+    # Create user (email and username uniqueness is enforced by the unique indexes)
     user_id = str(uuid.uuid4())
     user_doc = {
         "id": user_id,
         "username": user_data.username,
         "email": user_data.email,
-        "password": hash_password(user_data.password),
+        "password": await password_hasher.hash(user_data.password),
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     
-    await db.users.insert_one(user_doc)
+    try:
+        await db.users.insert_one(user_doc)
+    except DuplicateKeyError as e:
+        if duplicate_key_field(e) == "username":
+            raise HTTPException(status_code=400, detail="Username già in uso")
+        raise HTTPException(status_code=400, detail="Email già registrata")
     
     # Create token
     token = create_token(user_id)
@@ -336,9 +2206,11 @@ async def register(user_data: UserCreate):
     )
 
 @api_router.post("/auth/login", response_model=TokenResponse)
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, request: Request):
+    await rate_limiter.check(request, "login", credentials.email)
+    
     user = await db.users.find_one({"email": credentials.email}, {"_id": 0})
-    if not user or not verify_password(credentials.password, user["password"]):
+    if not user or not await password_hasher.verify(credentials.password, user["password"]):
         raise HTTPException(status_code=401, detail="Credenziali non valide")
     
     token = create_token(user["id"])
@@ -366,8 +2238,10 @@ async def get_me(current_user: dict = Depends(get_current_user)):
 # ============== ADMIN ROUTES ==============
 
 @api_router.post("/admin/login", response_model=AdminTokenResponse)
-async def admin_login(credentials: UserLogin):
+async def admin_login(credentials: UserLogin, request: Request):
     """Admin login with hardcoded credentials"""
+    await rate_limiter.check(request, "admin_login", credentials.email)
+    
     if credentials.email != ADMIN_EMAIL or credentials.password != ADMIN_PASSWORD:
         raise HTTPException(status_code=401, detail="Credenziali admin non valide")
     
@@ -379,10 +2253,15 @@ async def admin_login(credentials: UserLogin):
     )
 
 @api_router.get("/admin/news", response_model=List[NewsItem])
-async def get_all_news_admin(admin: dict = Depends(get_admin_user)):
+async def get_all_news_admin(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    admin: dict = Depends(get_admin_user)
+):
     """Get all news including inactive ones for admin"""
-    news = await db.news.find({}, {"_id": 0}).to_list(100)
-    return news
+    news = await paginate(db.news, {}, ["created_at", "id"], response, limit, cursor, {"_id": 0})
+    return list_response(news, response)
 
 @api_router.post("/admin/news", response_model=NewsItem)
 async def create_news_admin(news_data: NewsCreate, admin: dict = Depends(get_admin_user)):
@@ -398,7 +2277,10 @@ async def create_news_admin(news_data: NewsCreate, admin: dict = Depends(get_adm
     }
     
     await db.news.insert_one(news_doc)
-    return NewsItem(**news_doc)
+    news_cache.bump()
+    news = NewsItem(**news_doc)
+    event_broker.notify("broadcast", "news", {"action": "created", "news": news.model_dump()})
+    return news
 
 @api_router.delete("/admin/news/{news_id}")
 async def delete_news_admin(news_id: str, admin: dict = Depends(get_admin_user)):
@@ -406,6 +2288,8 @@ async def delete_news_admin(news_id: str, admin: dict = Depends(get_admin_user))
     result = await db.news.delete_one({"id": news_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="News non trovata")
+    news_cache.bump()
+    event_broker.notify("broadcast", "news", {"action": "deleted", "news": {"id": news_id}})
     return {"message": "News eliminata con successo"}
 
 @api_router.put("/admin/news/{news_id}")
@@ -421,31 +2305,21 @@ async def update_news_admin(news_id: str, news_data: NewsCreate, admin: dict = D
     result = await db.news.update_one({"id": news_id}, {"$set": update_data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="News non trovata")
+    news_cache.bump()
     
     updated = await db.news.find_one({"id": news_id}, {"_id": 0})
+    event_broker.notify("broadcast", "news", {"action": "updated", "news": updated})
     return NewsItem(**updated)
 
 # ============== NEWS ROUTES ==============
 
 @api_router.get("/news", response_model=List[NewsItem])
-async def get_news(current_user: dict = Depends(get_current_user)):
-    news = await db.news.find({"is_active": True}, {"_id": 0}).to_list(100)
-    
-    # If no news exist, create default questionnaire news
-    if not news:
-        default_news = {
-            "id": str(uuid.uuid4()),
-            "title": "Questionario sulla Personalità",
-            "description": "Scopri quale tipo di allenatore sei! Completa il questionario della Commissione dell'Accademia per ricevere la tua valutazione ufficiale.",
-            "news_type": "questionnaire",
-            "is_active": True,
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "size": "hero"
-        }
-        await db.news.insert_one(default_news)
-        news = [default_news]
-    
-    return news
+async def get_news(request: Request, current_user: dict = Depends(get_current_user)):
+    body, etag = await news_cache.get()
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @api_router.post("/news", response_model=NewsItem)
 async def create_news(news_data: NewsCreate, current_user: dict = Depends(get_current_user)):
@@ -460,14 +2334,18 @@ async def create_news(news_data: NewsCreate, current_user: dict = Depends(get_cu
     }
     
     await db.news.insert_one(news_doc)
-    return NewsItem(**news_doc)
+    news_cache.bump()
+    news = NewsItem(**news_doc)
+    event_broker.notify("broadcast", "news", {"action": "created", "news": news.model_dump()})
+    return news
 
 # ============== QUIZ ROUTES ==============
 
 @api_router.post("/quiz/submit", response_model=QuizResult)
 async def submit_quiz(quiz_data: QuizSubmit, current_user: dict = Depends(get_current_user)):
     # Calculate result
-    result = calculate_profile(quiz_data.answers)
+    profile_key = quiz_scorer.score(answer_pairs(quiz_data.answers))
+    result = profile_result(profile_key)
     
     # Save quiz response
     quiz_doc = {
@@ -481,28 +2359,213 @@ async def submit_quiz(quiz_data: QuizSubmit, current_user: dict = Depends(get_cu
             "profile_type": result.profile_type,
             "description": result.description
         },
+        "profile": profile_key,
+        "scoring_version": quiz_scorer.version,
         "submitted_at": datetime.now(timezone.utc).isoformat()
     }
     
+    # Save the quiz first; the email and the stats only follow a stored quiz
     await db.quiz_responses.insert_one(quiz_doc)
     
-    # Send email
-    await send_quiz_email(
+    # Queue the results email (the outbox worker sends it) and update the rollups
+    email = build_quiz_email(
         current_user["email"],
         current_user["username"],
         quiz_data.answers,
         result
     )
+    await asyncio.gather(
+        email_outbox.enqueue(email),
+        record_quiz_stats(quiz_doc)
+    )
     
     return result
 
+def parse_export_date(value: str, end: bool = False) -> str:
+    """ISO date or datetime as a UTC timestamp comparable with submitted_at"""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Data non valida: {value}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    if end and len(value) == 10:
+        # A bare end date includes the whole day
+        parsed += timedelta(days=1)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+QUIZ_EXPORT_QUESTIONS = max(question for question, _ in quiz_scorer.bits)
+QUIZ_EXPORT_COLUMNS = (
+    ["id", "user_id", "username", "email", "submitted_at", "profile", "profile_name", "profile_type", "scoring_version"]
+    + [f"q{n}" for n in range(1, QUIZ_EXPORT_QUESTIONS + 1)]
+)
+
+def quiz_export_row(doc: dict) -> list:
+    answers = {a["question_number"]: a["answer"] for a in doc.get("answers", [])}
+    result = doc.get("result") or {}
+    return [
+        doc.get("id"), doc.get("user_id"), doc.get("username"), doc.get("email"), doc.get("submitted_at"),
+        doc.get("profile"), result.get("profile_name"), result.get("profile_type"), doc.get("scoring_version")
+    ] + [answers.get(n, "") for n in range(1, QUIZ_EXPORT_QUESTIONS + 1)]
+
+async def stream_quiz_export(query: dict, export_format: str):
+    """Yield the export in chunks of QUIZ_EXPORT_BATCH_SIZE documents"""
+    cursor = db.quiz_responses.find(query, {"_id": 0}).sort(
+        [("submitted_at", ASCENDING), ("id", ASCENDING)]
+    ).batch_size(QUIZ_EXPORT_BATCH_SIZE)
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == "csv":
+        writer.writerow(QUIZ_EXPORT_COLUMNS)
+    
+    count = 0
+    async for doc in cursor:
+        if export_format == "csv":
+            writer.writerow(quiz_export_row(doc))
+        else:
+            buffer.write(json.dumps(doc, ensure_ascii=False))
+            buffer.write("\n")
+        count += 1
+        if count % QUIZ_EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+@api_router.get("/admin/quiz/export")
+async def export_quiz_admin(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    profile: Optional[str] = None,
+    admin: dict = Depends(get_admin_user)
+):
+    """Stream quiz responses as NDJSON or CSV, optionally filtered by date and profile"""
+    query = {}
+    if profile:
+        if profile not in PROFILE_DEFINITIONS:
+            raise HTTPException(status_code=400, detail=f"Profilo non valido: {profile}")
+        # Older responses get their profile from backfill_quiz_profiles at startup
+        query["profile"] = profile
+    if date_from or date_to:
+        query["submitted_at"] = {}
+        if date_from:
+            query["submitted_at"]["$gte"] = parse_export_date(date_from)
+        if date_to:
+            query["submitted_at"]["$lt" if len(date_to) == 10 else "$lte"] = parse_export_date(date_to, end=True)
+    
+    filename = f"quiz_responses_{datetime.now(timezone.utc):%Y%m%d_%H%M%S}.{export_format}"
+    media_type = "text/csv; charset=utf-8" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_quiz_export(query, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@api_router.post("/admin/quiz/rescore")
+async def rescore_quiz_admin(force: bool = False, admin: dict = Depends(get_admin_user)):
+    """Re-score quiz responses after the profile definitions change"""
+    summary = await rescore_quiz_responses(force=force)
+    if summary["changed"]:
+        await rebuild_quiz_stats()
+    return summary
+
+@api_router.get("/admin/stats")
+async def get_quiz_stats_admin(days: int = Query(30, ge=1, le=366), admin: dict = Depends(get_admin_user)):
+    """Aggregate quiz statistics, read from the quiz_stats rollups only"""
+    totals, daily = await asyncio.gather(
+        db.quiz_stats.find_one({"_id": "totals"}, {"_id": 0}),
+        db.quiz_stats.find({"_id": {"$regex": "^day:"}}, {"_id": 0}).sort("_id", DESCENDING).to_list(days)
+    )
+    totals = totals or {}
+    profile_counts = totals.get("profiles", {})
+    return {
+        "submissions": totals.get("submissions", 0),
+        "profiles": [
+            {"profile": key, "name": data["name"], "count": profile_counts.get(key, 0)}
+            for key, data in PROFILE_DEFINITIONS.items()
+        ],
+        "answers": totals.get("answers", {}),
+        "daily": list(reversed(daily))
+    }
+
+@api_router.post("/admin/stats/rebuild")
+async def rebuild_quiz_stats_admin(admin: dict = Depends(get_admin_user)):
+    """Rebuild the statistics rollups from scratch"""
+    return await rebuild_quiz_stats()
+
 @api_router.get("/quiz/history")
-async def get_quiz_history(current_user: dict = Depends(get_current_user)):
-    history = await db.quiz_responses.find(
+async def get_quiz_history(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    history = await paginate(
+        db.quiz_responses,
         {"user_id": current_user["id"]},
+        ["submitted_at", "id"],
+        response, limit, cursor,
         {"_id": 0}
-    ).to_list(100)
-    return history
+    )
+    return list_response(history, response)
+
+@api_router.get("/quiz/{quiz_id}/pdf")
+async def get_quiz_pdf(quiz_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+    """Quiz result as a PDF; users can download their own, admins any"""
+    query = {"id": quiz_id}
+    if not current_user.get("is_admin"):
+        query["user_id"] = current_user["id"]
+    quiz = await db.quiz_responses.find_one(query, {"_id": 0})
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Questionario non trovato")
+    
+    key = quiz_pdf_cache.key(quiz)
+    headers = {
+        "ETag": f'"{key}"',
+        # Private: the sheet carries the user's email. Immutable: new content gets a new key
+        "Cache-Control": "private, max-age=31536000, immutable"
+    }
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    data = await quiz_pdf_cache.get(quiz, key)
+    headers["Content-Disposition"] = f'inline; filename="questionario_{quiz_id}.pdf"'
+    return Response(content=data, media_type="application/pdf", headers=headers)
+
+# ============== DASHBOARD ROUTE ==============
+
+@api_router.get("/dashboard")
+async def get_dashboard(request: Request, current_user: dict = Depends(get_current_user)):
+    """News, quiz history and pokemon in one response, each with its own ETag.
+
+    Sections whose ETag is listed in If-None-Match come back as
+    {"etag": ..., "not_modified": true} without their items.
+    """
+    (news_body, news_etag), (history, history_cursor), (pokemon, pokemon_cursor) = await asyncio.gather(
+        news_cache.get(),
+        fetch_page(db.quiz_responses, {"user_id": current_user["id"]}, ["submitted_at", "id"], 100, projection={"_id": 0}),
+        fetch_page(db.user_pokemon, {"user_id": current_user["id"]}, ["assigned_at", "id"], 100, projection={"_id": 0})
+    )
+    
+    def section(etag: str, items_json: bytes, next_cursor: Optional[str] = None) -> bytes:
+        if etag_matches(request, etag):
+            return dump_json({"etag": etag, "not_modified": True})
+        # The news body is already serialized by the cache, so sections are joined as bytes
+        return b'{"etag":' + dump_json(etag) + b',"next_cursor":' + dump_json(next_cursor) + b',"items":' + items_json + b'}'
+    
+    history_json = dump_json(history)
+    pokemon_json = dump_json(pokemon)
+    body = b"".join([
+        b'{"news":', section(news_etag, news_body),
+        b',"quiz_history":', section(f'"history-{hashlib.sha1(history_json).hexdigest()[:16]}"', history_json, history_cursor),
+        b',"pokemon":', section(f'"pokemon-{hashlib.sha1(pokemon_json).hexdigest()[:16]}"', pokemon_json, pokemon_cursor),
+        b'}'
+    ])
+    return Response(content=body, media_type="application/json", headers={"Cache-Control": "private, no-cache"})
 
 # ============== NEWS DETAIL ROUTE ==============
 
@@ -516,28 +2579,313 @@ async def get_news_detail(news_id: str, current_user: dict = Depends(get_current
 # ============== POKEMON ROUTES ==============
 
 @api_router.get("/pokemon/my")
-async def get_my_pokemon(current_user: dict = Depends(get_current_user)):
+async def get_my_pokemon(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
     """Get all pokemon assigned to current user"""
-    pokemon = await db.user_pokemon.find(
+    pokemon = await paginate(
+        db.user_pokemon,
         {"user_id": current_user["id"]},
+        ["assigned_at", "id"],
+        response, limit, cursor,
         {"_id": 0}
-    ).to_list(100)
-    return pokemon
+    )
+    return list_response(pokemon, response)
+
+@api_router.get("/pokemon/catalog")
+async def get_pokemon_catalog(
+    request: Request,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=CATALOG_MAX_PAGE_SIZE),
+    fields: Optional[str] = None
+):
+    """Paginated Pokemon catalog served from the local import"""
+    if not pokemon_catalog.entries:
+        raise HTTPException(status_code=503, detail="Catalogo Pokemon non disponibile")
+    
+    selected = None
+    if fields:
+        selected = tuple(field.strip() for field in fields.split(",") if field.strip())
+        invalid = [field for field in selected if field not in CATALOG_FIELDS]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Campi non validi: {', '.join(invalid)}")
+    
+    body, etag = pokemon_catalog.page(offset, limit, selected)
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=3600"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@api_router.get("/pokemon/search")
+async def search_pokemon(
+    q: str = Query(..., min_length=1, max_length=50),
+    limit: int = Query(10, ge=1, le=SEARCH_MAX_RESULTS)
+):
+    """Ranked Pokemon name search (prefix, substring and typo-tolerant, any language)"""
+    if not pokemon_catalog.entries:
+        raise HTTPException(status_code=503, detail="Catalogo Pokemon non disponibile")
+    return FastJSONResponse(
+        {"query": q, "results": pokemon_catalog.search_index.search(q, limit)},
+        headers={"Cache-Control": "public, max-age=300"}
+    )
+
+@api_router.get("/pokemon/{pokemon_id}/detail")
+async def get_pokemon_detail(pokemon_id: int, request: Request):
+    """Prebuilt Pokemon detail: species, moves and TM/HM data in one document"""
+    headers = {"Cache-Control": "public, max-age=86400"}
+    if pokemon_catalog.details_version:
+        headers["ETag"] = f'"{pokemon_catalog.details_version}-{pokemon_id}"'
+        if etag_matches(request, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+    
+    detail = await db.pokemon_details.find_one({"id": pokemon_id}, {"_id": 0})
+    if not detail:
+        raise HTTPException(status_code=404, detail="Pokemon non trovato")
+    
+    return FastJSONResponse(detail, headers=headers)
+
+@api_router.post("/admin/pokemon/catalog/reload")
+async def reload_pokemon_catalog(admin: dict = Depends(get_admin_user)):
+    """Reload the catalog after running import_pokedex.py"""
+    await pokemon_catalog.load()
+    return {
+        "count": len(pokemon_catalog.entries),
+        "version": pokemon_catalog.version,
+        "details_version": pokemon_catalog.details_version
+    }
 
 @api_router.get("/admin/users")
-async def get_all_users(admin: dict = Depends(get_admin_user)):
+async def get_all_users(
+    response: Response,
+    limit: int = Query(1000, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    admin: dict = Depends(get_admin_user)
+):
     """Get all registered users for admin"""
-    users = await db.users.find({}, {"_id": 0, "password": 0}).to_list(1000)
-    return users
+    users = await paginate(db.users, {}, ["created_at", "id"], response, limit, cursor, {"_id": 0, "password": 0})
+    return list_response(users, response)
+
+async def count_by_user(collection, user_ids: List[str]) -> dict:
+    """{user_id: number of documents} for the given users, via the user_id index"""
+    pipeline = [
+        {"$match": {"user_id": {"$in": user_ids}}},
+        {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}
+    ]
+    return {row["_id"]: row["count"] async for row in collection.aggregate(pipeline)}
+
+@api_router.get("/admin/users/search")
+async def search_users_admin(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100),
+    field: str = Query("username", pattern="^(username|email)$"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    admin: dict = Depends(get_admin_user)
+):
+    """Case-insensitive prefix search on username or email, with pokemon and quiz counts.
+
+    One field per search, so both the range and the sort come from that
+    field's index.
+    """
+    prefix = q.strip()
+    if not prefix:
+        raise HTTPException(status_code=400, detail="Testo di ricerca vuoto")
+    # U+FFFF sorts after every character under the collation, closing the prefix range
+    query = {field: {"$gte": prefix, "$lt": prefix + "\uffff"}}
+    
+    users = await paginate(
+        db.users, query, [field, "id"], response, limit, cursor,
+        {"_id": 0, "id": 1, "username": 1, "email": 1, "created_at": 1},
+        collation=USER_SEARCH_COLLATION
+    )
+    
+    user_ids = [user["id"] for user in users]
+    pokemon_counts, quiz_counts = await asyncio.gather(
+        count_by_user(db.user_pokemon, user_ids),
+        count_by_user(db.quiz_responses, user_ids)
+    )
+    for user in users:
+        user["pokemon_count"] = pokemon_counts.get(user["id"], 0)
+        user["quiz_count"] = quiz_counts.get(user["id"], 0)
+    return list_response(users, response)
+
+# Per-user joins for the overview; each $lookup runs on the user_id index of its collection
+USER_OVERVIEW_STAGES = [
+    {"$lookup": {
+        "from": "user_pokemon",
+        "let": {"user_id": "$id"},
+        "pipeline": [
+            {"$match": {"$expr": {"$eq": ["$user_id", "$$user_id"]}}},
+            {"$sort": {"pokemon_id": 1}},
+            {"$group": {"_id": None, "pokemon_ids": {"$push": "$pokemon_id"}}}
+        ],
+        "as": "pokemon"
+    }},
+    {"$lookup": {
+        "from": "quiz_responses",
+        "let": {"user_id": "$id"},
+        "pipeline": [
+            {"$match": {"$expr": {"$eq": ["$user_id", "$$user_id"]}}},
+            {"$sort": {"submitted_at": -1}},
+            {"$group": {
+                "_id": None,
+                "quiz_count": {"$sum": 1},
+                "latest_profile": {"$first": "$profile"},
+                "latest_result": {"$first": "$result.profile_name"},
+                "latest_submitted_at": {"$first": "$submitted_at"}
+            }}
+        ],
+        "as": "quizzes"
+    }},
+    {"$set": {
+        "pokemon": {"$arrayElemAt": ["$pokemon", 0]},
+        "quizzes": {"$arrayElemAt": ["$quizzes", 0]}
+    }},
+    {"$project": {
+        "id": 1,
+        "username": 1,
+        "email": 1,
+        "created_at": 1,
+        "pokemon_ids": {"$ifNull": ["$pokemon.pokemon_ids", []]},
+        "quiz_count": {"$ifNull": ["$quizzes.quiz_count", 0]},
+        "latest_profile": {"$ifNull": ["$quizzes.latest_profile", None]},
+        "latest_result": {"$ifNull": ["$quizzes.latest_result", None]},
+        "latest_submitted_at": {"$ifNull": ["$quizzes.latest_submitted_at", None]}
+    }}
+]
+
+@api_router.get("/admin/users/overview")
+async def get_users_overview_admin(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    admin: dict = Depends(get_admin_user)
+):
+    """Users with their pokemon ids, latest quiz profile and quiz count, in one query"""
+    users = await paginate(
+        db.users, {}, ["created_at", "id"], response, limit, cursor,
+        {"_id": 0, "id": 1, "username": 1, "email": 1, "created_at": 1},
+        stages=USER_OVERVIEW_STAGES
+    )
+    return list_response(users, response)
+
+async def read_import_rows(request: Request, import_format: str):
+    """Yield (line number, row dict or error) from a streamed NDJSON or CSV upload"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    header = None
+    line_number = 0
+    pending = ""
+    
+    async def lines():
+        nonlocal pending
+        async for chunk in request.stream():
+            pending += decoder.decode(chunk)
+            *complete, pending = pending.split("\n")
+            for line in complete:
+                yield line
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield pending
+    
+    async for line in lines():
+        line_number += 1
+        line = line.rstrip("\r")
+        if not line.strip():
+            continue
+        if import_format == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            yield line_number, dict(zip(header, values))
+        else:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, f"JSON non valido: {e.msg}"
+                continue
+            yield line_number, row if isinstance(row, dict) else "La riga deve essere un oggetto JSON"
+
+async def import_user_batch(batch: list, report: dict):
+    """Hash and insert one batch of validated rows; duplicates are reported, not raised"""
+    hashes = await password_hasher.hash_many([user.password for _, user in batch])
+    now = datetime.now(timezone.utc).isoformat()
+    docs = [{
+        "id": str(uuid.uuid4()),
+        "username": user.username,
+        "email": user.email,
+        "password": hashed,
+        "created_at": now
+    } for (_, user), hashed in zip(batch, hashes)]
+    
+    failed = set()
+    try:
+        await db.users.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            failed.add(error["index"])
+            line_number = batch[error["index"]][0]
+            if error.get("code") == 11000:
+                field = duplicate_key_field(error)
+                detail = "Username già in uso" if field == "username" else "Email già registrata"
+                report["errors"].append({"line": line_number, "status": "duplicate", "detail": detail})
+            else:
+                report["errors"].append({"line": line_number, "status": "error", "detail": error.get("errmsg")})
+    report["created"] += len(docs) - len(failed)
+
+@api_router.post("/admin/users/import")
+async def import_users_admin(
+    request: Request,
+    import_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    admin: dict = Depends(get_admin_user)
+):
+    """Create users from a streamed NDJSON or CSV upload (username, email, password)"""
+    report = {"created": 0, "errors": []}
+    batch = []
+    rows = 0
+    async for line_number, row in read_import_rows(request, import_format):
+        rows += 1
+        if isinstance(row, str):
+            report["errors"].append({"line": line_number, "status": "invalid", "detail": row})
+            continue
+        try:
+            batch.append((line_number, UserCreate(**row)))
+        except ValidationError as e:
+            fields = ", ".join(".".join(str(part) for part in err["loc"]) for err in e.errors())
+            report["errors"].append({"line": line_number, "status": "invalid", "detail": f"Campi non validi: {fields}"})
+            continue
+        if len(batch) >= USER_IMPORT_BATCH_SIZE:
+            await import_user_batch(batch, report)
+            batch = []
+    if batch:
+        await import_user_batch(batch, report)
+    
+    report["errors"].sort(key=lambda error: error["line"])
+    summary = {"rows": rows, "created": report["created"]}
+    for error in report["errors"]:
+        summary[error["status"]] = summary.get(error["status"], 0) + 1
+    return {"summary": summary, "errors": report["errors"]}
 
 @api_router.get("/admin/users/{user_id}/pokemon")
-async def get_user_pokemon_admin(user_id: str, admin: dict = Depends(get_admin_user)):
+async def get_user_pokemon_admin(
+    user_id: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    admin: dict = Depends(get_admin_user)
+):
     """Get pokemon assigned to a specific user"""
-    pokemon = await db.user_pokemon.find(
+    pokemon = await paginate(
+        db.user_pokemon,
         {"user_id": user_id},
+        ["assigned_at", "id"],
+        response, limit, cursor,
         {"_id": 0}
-    ).to_list(100)
-    return pokemon
+    )
+    return list_response(pokemon, response)
 
 @api_router.post("/admin/users/{user_id}/pokemon")
 async def assign_pokemon_to_user(user_id: str, pokemon_data: PokemonAssign, admin: dict = Depends(get_admin_user)):
@@ -547,16 +2895,7 @@ async def assign_pokemon_to_user(user_id: str, pokemon_data: PokemonAssign, admi
     if not user:
         raise HTTPException(status_code=404, detail="Utente non trovato")
     
-    # Check if pokemon already assigned
-    existing = await db.user_pokemon.find_one({
-        "user_id": user_id,
-        "pokemon_id": pokemon_data.pokemon_id
-    }, {"_id": 0})
-    
-    if existing:
-        raise HTTPException(status_code=400, detail="Pokemon già assegnato a questo utente")
-    
-    # Assign pokemon
+    # Assign pokemon (duplicates are rejected by the user_id/pokemon_id unique index)
     pokemon_doc = {
         "id": str(uuid.uuid4()),
         "user_id": user_id,
@@ -565,8 +2904,13 @@ async def assign_pokemon_to_user(user_id: str, pokemon_data: PokemonAssign, admi
         "assigned_at": datetime.now(timezone.utc).isoformat()
     }
     
-    await db.user_pokemon.insert_one(pokemon_doc)
-    return UserPokemon(**pokemon_doc)
+    try:
+        await db.user_pokemon.insert_one(pokemon_doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Pokemon già assegnato a questo utente")
+    pokemon = UserPokemon(**pokemon_doc)
+    event_broker.notify(f"user:{user_id}", "pokemon", {"action": "assigned", "pokemon": pokemon.model_dump()})
+    return pokemon
 
 @api_router.delete("/admin/users/{user_id}/pokemon/{pokemon_id}")
 async def remove_pokemon_from_user(user_id: str, pokemon_id: int, admin: dict = Depends(get_admin_user)):
@@ -578,9 +2922,173 @@ async def remove_pokemon_from_user(user_id: str, pokemon_id: int, admin: dict =
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Pokemon non trovato per questo utente")
+    event_broker.notify(f"user:{user_id}", "pokemon", {"action": "removed", "pokemon": {"user_id": user_id, "pokemon_id": pokemon_id}})
     
     return {"message": "Pokemon rimosso con successo"}
 
+def mark_insert_errors(error: BulkWriteError, results: List[dict]):
+    """Set the outcome of every result whose document failed in an unordered insert_many"""
+    for write_error in error.details.get("writeErrors", []):
+        result = results[write_error["index"]]
+        if write_error.get("code") == 11000:
+            result["status"] = "duplicate"
+        else:
+            result["status"] = "error"
+            result["detail"] = write_error.get("errmsg")
+
+@api_router.post("/admin/pokemon/bulk-assign")
+async def bulk_assign_pokemon(data: BulkPokemonAssign, admin: dict = Depends(get_admin_user)):
+    """Assign many pokemon in one request, reporting the outcome of each item"""
+    user_ids = list({item.user_id for item in data.items})
+    existing_users = {u["id"] async for u in db.users.find({"id": {"$in": user_ids}}, {"_id": 0, "id": 1})}
+    
+    results = []
+    docs = []
+    doc_results = []
+    seen = set()
+    now = datetime.now(timezone.utc).isoformat()
+    for item in data.items:
+        result = {"user_id": item.user_id, "pokemon_id": item.pokemon_id, "status": "assigned"}
+        results.append(result)
+        if item.user_id not in existing_users:
+            result["status"] = "user_not_found"
+        elif (item.user_id, item.pokemon_id) in seen:
+            result["status"] = "duplicate"
+        else:
+            seen.add((item.user_id, item.pokemon_id))
+            docs.append({
+                "id": str(uuid.uuid4()),
+                "user_id": item.user_id,
+                "pokemon_id": item.pokemon_id,
+                "pokemon_name": item.pokemon_name,
+                "assigned_at": now
+            })
+            doc_results.append(result)
+    
+    if docs:
+        # Unordered: one duplicate does not stop the rest of the batch
+        try:
+            await db.user_pokemon.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            mark_insert_errors(e, doc_results)
+    
+    for doc, result in zip(docs, doc_results):
+        if result["status"] == "assigned":
+            pokemon = UserPokemon(**doc).model_dump()
+            event_broker.notify(f"user:{doc['user_id']}", "pokemon", {"action": "assigned", "pokemon": pokemon})
+    
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    return {"summary": summary, "results": results}
+
+@api_router.post("/admin/pokemon/bulk-remove")
+async def bulk_remove_pokemon(data: BulkPokemonRemove, admin: dict = Depends(get_admin_user)):
+    """Remove many pokemon in one request, reporting the outcome of each item"""
+    by_user = {}
+    for item in data.items:
+        by_user.setdefault(item.user_id, set()).add(item.pokemon_id)
+    if not by_user:
+        return {"summary": {}, "results": []}
+    
+    query = {"$or": [
+        {"user_id": user_id, "pokemon_id": {"$in": sorted(pokemon_ids)}}
+        for user_id, pokemon_ids in by_user.items()
+    ]}
+    existing = {
+        (doc["user_id"], doc["pokemon_id"])
+        async for doc in db.user_pokemon.find(query, {"_id": 0, "user_id": 1, "pokemon_id": 1})
+    }
+    if existing:
+        await db.user_pokemon.delete_many(query)
+    
+    results = []
+    summary = {}
+    reported = set()
+    for item in data.items:
+        pair = (item.user_id, item.pokemon_id)
+        status = "removed" if pair in existing and pair not in reported else "not_found"
+        if status == "removed":
+            event_broker.notify(f"user:{item.user_id}", "pokemon", {"action": "removed", "pokemon": {"user_id": item.user_id, "pokemon_id": item.pokemon_id}})
+        reported.add(pair)
+        results.append({"user_id": item.user_id, "pokemon_id": item.pokemon_id, "status": status})
+        summary[status] = summary.get(status, 0) + 1
+    return {"summary": summary, "results": results}
+
+@api_router.get("/admin/slow-queries")
+async def get_slow_queries_admin(limit: int = Query(50, ge=1, le=500), admin: dict = Depends(get_admin_user)):
+    """Slowest sampled MongoDB operations with their query plans"""
+    return await db.slow_queries.find({}, {"_id": 0}).sort("duration_ms", DESCENDING).to_list(limit)
+
+@api_router.get("/admin/email-outbox")
+async def get_email_outbox_admin(admin: dict = Depends(get_admin_user)):
+    """Outbox counts by status plus the most recent dead-lettered emails"""
+    counts = await db.email_outbox.aggregate([
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ]).to_list(None)
+    dead = await db.email_outbox.find(
+        {"status": "dead"},
+        {"_id": 0, "id": 1, "message.subject": 1, "attempts": 1, "last_error": 1, "created_at": 1}
+    ).sort("created_at", -1).to_list(50)
+    return {"counts": {c["_id"]: c["count"] for c in counts}, "dead": dead}
+
+# ============== EVENTS ROUTE ==============
+
+@api_router.post("/events/token")
+async def create_events_token_route(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Stream token for /api/events, so the session token never ends up in a URL"""
+    user = await get_current_user(credentials)
+    session_expires = decode_token(credentials.credentials).get("exp")
+    return {"token": create_events_token(user["id"], session_expires), "expires_in": EVENTS_TOKEN_SECONDS}
+
+@api_router.get("/events")
+async def stream_events(token: str = Query(...)):
+    """Server-sent events: news for everyone, pokemon assignments for the token's user.
+
+    EventSource cannot send headers, so the token is a query parameter:
+    only the short-lived stream token from POST /api/events/token is
+    accepted. The stream ends when the session it was issued for expires.
+    """
+    try:
+        payload = decode_token(token)
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token scaduto")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Token non valido")
+    if payload.get("scope") != "events" or not payload.get("sub"):
+        raise HTTPException(status_code=401, detail="Token non valido")
+    user_id = payload["sub"]
+    expires = payload.get("session_exp")
+    
+    async def stream():
+        # Subscribe once the stream runs, so a client gone before the first chunk leaves nothing behind
+        subscription = None
+        try:
+            subscription = event_broker.subscribe(["broadcast", f"user:{user_id}"])
+            yield b"retry: 5000\n\n"
+            while True:
+                if subscription.overflowed:
+                    # Missed events cannot be replayed; the client reconnects and reloads
+                    yield b"event: reset\ndata: {}\n\n"
+                    return
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if expires and time.time() >= expires:
+                        yield b"event: expired\ndata: {}\n\n"
+                        return
+                    message = b": heartbeat\n\n"
+                yield message
+        finally:
+            if subscription is not None:
+                event_broker.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # ============== ROOT ROUTE ==============
 
 @api_router.get("/")
@@ -590,14 +3098,99 @@ async def root():
 # Include router
 app.include_router(api_router)
 
+# ============== METRICS ENDPOINT ==============
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, statuses and latency per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = 500
+        
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        started = time.perf_counter()
+        http_requests_in_progress.inc()
+        scope_token = request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_scope.reset(scope_token)
+            http_requests_in_progress.dec()
+            # Route templates keep label cardinality bounded (no ids in paths)
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            http_request_duration.observe(time.perf_counter() - started, method=scope["method"], route=path)
+            http_requests_total.inc(method=scope["method"], route=path, status=status)
+
+def _cache_counts(attribute: str) -> dict:
+    caches = {"token": token_cache, "user": user_cache, "news": news_cache, "catalog_pages": pokemon_catalog._pages}
+    return {(name,): getattr(cache, attribute) for name, cache in caches.items()}
+
+metrics.register(CallbackMetric(
+    "cache_hits_total", "In-process cache hits", "counter", ("cache",), lambda: _cache_counts("hits")))
+metrics.register(CallbackMetric(
+    "cache_misses_total", "In-process cache misses", "counter", ("cache",), lambda: _cache_counts("misses")))
+metrics.register(CallbackMetric(
+    "emails_total", "Outbox delivery attempts by outcome", "counter", ("outcome",),
+    lambda: {("sent",): email_outbox.sent, ("failed",): email_outbox.failed, ("dead",): email_outbox.dead}))
+metrics.register(CallbackMetric(
+    "password_hash_pending", "bcrypt calls queued or running", "gauge", (),
+    lambda: {(): password_hasher.pending}))
+metrics.register(CallbackMetric(
+    "password_hash_rejected_total", "bcrypt calls rejected because the pool was full", "counter", (),
+    lambda: {(): password_hasher.rejected}))
+
+metrics.register(CallbackMetric(
+    "events_connections", "Open /api/events streams", "gauge", (),
+    lambda: {(): event_broker.connections}))
+metrics.register(CallbackMetric(
+    "events_published_total", "Events published to the in-process broker", "counter", (),
+    lambda: {(): event_broker.published}))
+metrics.register(CallbackMetric(
+    "events_overflowed_total", "Event streams closed because the client fell behind", "counter", (),
+    lambda: {(): event_broker.dropped}))
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint (outside /api, so not exposed through the ingress)"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Retry-After"],
 )
 
+app.add_middleware(MetricsMiddleware)
+
+@app.on_event("startup")
+async def startup_db_client():
+    await ensure_indexes()
+    await pokemon_catalog.load()
+    await ensure_quiz_stats()
+    email_outbox.start()
+    slow_query_log.start()
+    await event_broker.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await email_outbox.stop()
+    await slow_query_log.stop()
+    await event_broker.stop()
     client.close()
+    password_hasher.shutdown()
+    quiz_pdf_cache.shutdown()
@@ -0,0 +1,446 @@
+"""Async load test and latency benchmark for the Pokémon Academy API.
+
+Replays the backend_test.py scenarios (register, login, news, quiz submit,
+history, admin pokemon assign/list/remove) with many concurrent virtual
+users and reports throughput and p50/p95/p99 latency per endpoint.
+
+By default a local server is started on a free port against a local Mongo:
+a throwaway ``mongod`` when one is on PATH, otherwise an in-memory stand-in
+(requires ``mongomock-motor``). Use --base-url to target a running server.
+
+With --events every virtual user also holds an /api/events stream and the
+delivery latency of its pokemon assignments is reported. --events-source
+changestream runs the server with EVENTS_SOURCE=changestream against a
+single-node replica set (needs mongod).
+
+    python backend_benchmark.py --users 50 --iterations 5
+    python backend_benchmark.py --baseline benchmark_results.json
+    python backend_benchmark.py --events --events-source changestream
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+ROOT_DIR = Path(__file__).parent
+BACKEND_DIR = ROOT_DIR / "backend"
+
+ADMIN_EMAIL = os.environ.get("ADMIN_EMAIL", "aquilareale.mz@gmail.com")
+ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "Init1234")
+
+QUIZ_ANSWERS = [
+    {"question_number": 1, "answer": "a"},
+    {"question_number": 2, "answer": "b"},
+    {"question_number": 3, "answer": "c"},
+    {"question_number": 4, "answer": "a"},
+    {"question_number": 5, "answer": "d"},
+    {"question_number": 6, "answer": "b"},
+    {"question_number": 7, "answer": "a"},
+    {"question_number": 8, "answer": "b"},
+    {"question_number": 9, "answer": "a"},
+    {"question_number": 10, "answer": "a"},
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class LocalMongo:
+    """Throwaway mongod on a free port with its data in a temp directory"""
+
+    def __init__(self, replica_set: str = None):
+        self.replica_set = replica_set
+        self.port = free_port()
+        self.url = f"mongodb://127.0.0.1:{self.port}/"
+        if replica_set:
+            self.url += f"?replicaSet={replica_set}&directConnection=true"
+        self._dir = None
+        self._process = None
+
+    @staticmethod
+    def available() -> bool:
+        return shutil.which("mongod") is not None
+
+    def start(self):
+        self._dir = tempfile.mkdtemp(prefix="bench-mongo-")
+        command = ["mongod", "--dbpath", self._dir, "--port", str(self.port), "--bind_ip", "127.0.0.1", "--quiet"]
+        if self.replica_set:
+            command += ["--replSet", self.replica_set]
+        self._process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        from pymongo import MongoClient
+        from pymongo.errors import PyMongoError
+        client = MongoClient(f"mongodb://127.0.0.1:{self.port}/", directConnection=True, serverSelectionTimeoutMS=500)
+        deadline = time.monotonic() + 30
+        try:
+            while True:
+                try:
+                    client.admin.command("ping")
+                    break
+                except PyMongoError:
+                    if time.monotonic() > deadline:
+                        raise RuntimeError("mongod did not start")
+                    time.sleep(0.2)
+            if self.replica_set:
+                client.admin.command("replSetInitiate", {
+                    "_id": self.replica_set,
+                    "members": [{"_id": 0, "host": f"127.0.0.1:{self.port}"}]
+                })
+                while not client.admin.command("hello").get("isWritablePrimary"):
+                    if time.monotonic() > deadline:
+                        raise RuntimeError("replica set did not elect a primary")
+                    time.sleep(0.2)
+        finally:
+            client.close()
+
+    def stop(self):
+        if self._process:
+            self._process.terminate()
+            self._process.wait(timeout=30)
+        if self._dir:
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+
+def serve_inmemory(port: int):
+    """Run the API against an in-memory Mongo stand-in (mongomock-motor)"""
+    os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1/")
+    os.environ.setdefault("DB_NAME", "benchmark")
+    sys.path.insert(0, str(BACKEND_DIR))
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("No mongod on PATH and mongomock-motor is not installed; pass --mongo-url")
+    import uvicorn
+    import server
+
+    server.client = AsyncMongoMockClient()
+    server.db = server.client[os.environ["DB_NAME"]]
+    uvicorn.run(server.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+class LocalServer:
+    """uvicorn subprocess serving backend/server.py"""
+
+    def __init__(self, mongo_url: str = None, env: dict = None):
+        self.mongo_url = mongo_url
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.env = env or {}
+        self._mail_dir = None
+        self._process = None
+
+    def start(self):
+        self._mail_dir = tempfile.mkdtemp(prefix="bench-mail-")
+        env = {
+            **os.environ,
+            "DB_NAME": f"benchmark_{int(time.time())}",
+            # Never send real email while benchmarking
+            "EMAIL_TRANSPORT": "file",
+            "EMAIL_FILE_DIR": self._mail_dir,
+            "ADMIN_EMAIL": ADMIN_EMAIL,
+            "ADMIN_PASSWORD": ADMIN_PASSWORD,
+            # Every simulated user logs in from 127.0.0.1
+            "RATE_LIMIT_BACKEND": "off",
+            **self.env,
+        }
+        if self.mongo_url:
+            env["MONGO_URL"] = self.mongo_url
+            command = [sys.executable, "-m", "uvicorn", "server:app",
+                       "--host", "127.0.0.1", "--port", str(self.port), "--log-level", "warning"]
+            self._process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+        else:
+            command = [sys.executable, str(Path(__file__).resolve()), "--serve-inmemory", str(self.port)]
+            self._process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+
+    async def wait_ready(self, timeout: float = 60):
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient() as client:
+            while True:
+                if self._process.poll() is not None:
+                    raise RuntimeError("server exited during startup")
+                try:
+                    response = await client.get(f"{self.base_url}/api/")
+                    if response.status_code == 200:
+                        return
+                except httpx.HTTPError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError("server did not become ready")
+                await asyncio.sleep(0.2)
+
+    def stop(self):
+        if self._process:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        if self._mail_dir:
+            shutil.rmtree(self._mail_dir, ignore_errors=True)
+
+
+class PokemonAcademyBenchmark:
+    EVENT_LABEL = "SSE pokemon delivery"
+
+    def __init__(self, base_url: str, users: int, iterations: int, timeout: float = 30, events: bool = False):
+        self.api_url = f"{base_url}/api"
+        self.users = users
+        self.iterations = iterations
+        self.timeout = timeout
+        self.events = events
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.admin_headers = None
+        self.run_id = datetime.now().strftime("%H%M%S%f")
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, path: str, **kwargs):
+        """Send one request and record its latency under label"""
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, f"{self.api_url}{path}", **kwargs)
+        except httpx.HTTPError as e:
+            self.samples[label].append(time.perf_counter() - started)
+            self.errors[label] += 1
+            self.statuses[label][type(e).__name__] += 1
+            return None
+        self.samples[label].append(time.perf_counter() - started)
+        self.statuses[label][str(response.status_code)] += 1
+        if response.status_code >= 400:
+            self.errors[label] += 1
+        return response
+
+    async def admin_login(self, client: httpx.AsyncClient):
+        response = await self.request(client, "POST /admin/login", "POST", "/admin/login",
+                                      json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+        if response is None or response.status_code != 200:
+            raise RuntimeError("admin login failed, check ADMIN_EMAIL/ADMIN_PASSWORD")
+        self.admin_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def user_scenario(self, client: httpx.AsyncClient, index: int):
+        """One virtual user: the backend_test.py flow, repeated"""
+        credentials = {
+            "username": f"bench_{self.run_id}_{index}",
+            "email": f"bench_{self.run_id}_{index}@example.com",
+            "password": "BenchPassword123!"
+        }
+        response = await self.request(client, "POST /auth/register", "POST", "/auth/register", json=credentials)
+        if response is None or response.status_code != 200:
+            return
+        user_id = response.json()["user"]["id"]
+
+        response = await self.request(client, "POST /auth/login", "POST", "/auth/login",
+                                      json={"email": credentials["email"], "password": credentials["password"]})
+        if response is None or response.status_code != 200:
+            return
+        token = response.json()['access_token']
+        headers = {"Authorization": f"Bearer {token}"}
+
+        listener = None
+        pending = {}
+        if self.events:
+            ready = asyncio.Event()
+            listener = asyncio.create_task(self.listen_events(client, token, pending, ready))
+            await asyncio.wait_for(ready.wait(), self.timeout)
+
+        for iteration in range(self.iterations):
+            await self.request(client, "GET /auth/me", "GET", "/auth/me", headers=headers)
+            await self.request(client, "GET /news", "GET", "/news", headers=headers)
+            await self.request(client, "POST /quiz/submit", "POST", "/quiz/submit", headers=headers,
+                               json={"answers": QUIZ_ANSWERS})
+            await self.request(client, "GET /quiz/history", "GET", "/quiz/history", headers=headers)
+
+            pokemon_id = index * self.iterations + iteration + 1
+            pending[pokemon_id] = time.perf_counter()
+            await self.request(client, "POST /admin/users/{id}/pokemon", "POST", f"/admin/users/{user_id}/pokemon",
+                               headers=self.admin_headers,
+                               json={"pokemon_id": pokemon_id, "pokemon_name": f"pokemon-{pokemon_id}"})
+            await self.request(client, "GET /pokemon/my", "GET", "/pokemon/my", headers=headers)
+            await self.request(client, "GET /admin/users/{id}/pokemon", "GET", f"/admin/users/{user_id}/pokemon",
+                               headers=self.admin_headers)
+            await self.request(client, "DELETE /admin/users/{id}/pokemon/{pokemon_id}", "DELETE",
+                               f"/admin/users/{user_id}/pokemon/{pokemon_id}", headers=self.admin_headers)
+
+        if listener:
+            # Give the last assignments a moment to arrive; anything still pending counts as lost
+            deadline = time.monotonic() + 5
+            while pending and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            listener.cancel()
+            self.errors[self.EVENT_LABEL] += len(pending)
+            self.statuses[self.EVENT_LABEL]["lost"] += len(pending)
+
+    async def listen_events(self, client: httpx.AsyncClient, token: str, pending: dict, ready: asyncio.Event):
+        """Read the user's event stream and time each assignment from request to delivery"""
+        async with client.stream("GET", f"{self.api_url}/events", params={"token": token},
+                                 timeout=httpx.Timeout(self.timeout, read=None)) as response:
+            ready.set()
+            event = None
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:") and event == "pokemon":
+                    data = json.loads(line[5:])
+                    if data["action"] != "assigned":
+                        continue
+                    sent = pending.pop(data["pokemon"]["pokemon_id"], None)
+                    if sent is not None:
+                        self.samples[self.EVENT_LABEL].append(time.perf_counter() - sent)
+                        self.statuses[self.EVENT_LABEL]["delivered"] += 1
+
+    async def run(self) -> dict:
+        # Event streams hold a connection of their own
+        connections = self.users * (2 if self.events else 1) + 1
+        limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client:
+            await self.admin_login(client)
+            started = time.perf_counter()
+            await asyncio.gather(*(self.user_scenario(client, index) for index in range(self.users)))
+            elapsed = time.perf_counter() - started
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for label, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            endpoints[label] = {
+                "requests": len(ordered),
+                "errors": self.errors[label],
+                "statuses": dict(self.statuses[label]),
+                "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+                "mean_ms": round(statistics.fmean(ordered) * 1000, 2),
+                "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+            }
+        total = sum(e["requests"] for e in endpoints.values())
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "config": {"users": self.users, "iterations": self.iterations},
+            "elapsed_seconds": round(elapsed, 3),
+            "total_requests": total,
+            "total_errors": sum(e["errors"] for e in endpoints.values()),
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+def print_report(report: dict):
+    print(f"\n{'Endpoint':<48} {'reqs':>6} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    print("-" * 96)
+    for label, e in report["endpoints"].items():
+        print(f"{label:<48} {e['requests']:>6} {e['errors']:>5} {e['throughput_rps']:>8.1f} "
+              f"{e['p50_ms']:>8.1f} {e['p95_ms']:>8.1f} {e['p99_ms']:>8.1f}")
+    print("-" * 96)
+    print(f"{report['total_requests']} requests, {report['total_errors']} errors in "
+          f"{report['elapsed_seconds']}s ({report['throughput_rps']} req/s); latencies in ms")
+
+
+def compare_with_baseline(report: dict, baseline: dict, tolerance: float) -> list:
+    """Endpoints whose p95 got worse than the baseline by more than tolerance"""
+    regressions = []
+    for label, current in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(label)
+        if not previous or not previous["p95_ms"]:
+            continue
+        change = current["p95_ms"] / previous["p95_ms"] - 1
+        if change > tolerance:
+            regressions.append(f"{label}: p95 {previous['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms (+{change:.0%})")
+    return regressions
+
+
+async def run_benchmark(args) -> dict:
+    mongo = server = None
+    base_url = args.base_url
+    try:
+        if not base_url:
+            mongo_url = args.mongo_url
+            changestream = args.events_source == "changestream"
+            if not mongo_url and (args.mongo in ("auto", "mongod") or changestream) and LocalMongo.available():
+                # Change streams need a replica set; a single node is enough
+                mongo = LocalMongo(replica_set="rs0" if changestream else None)
+                mongo.start()
+                mongo_url = mongo.url
+            elif not mongo_url and (args.mongo == "mongod" or changestream):
+                raise SystemExit("mongod not found on PATH")
+            server = LocalServer(mongo_url, env={"EVENTS_SOURCE": args.events_source})
+            server.start()
+            await server.wait_ready()
+            base_url = server.base_url
+            print(f"Benchmarking local server at {base_url} ({'mongod' if mongo_url else 'in-memory Mongo'})")
+
+        benchmark = PokemonAcademyBenchmark(base_url, args.users, args.iterations, events=args.events)
+        return await benchmark.run()
+    finally:
+        if server:
+            server.stop()
+        if mongo:
+            mongo.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async load test for the Pokémon Academy API")
+    parser.add_argument("--base-url", help="Benchmark an already running server instead of starting one")
+    parser.add_argument("--mongo-url", help="Mongo for the local server (default: start a local stand-in)")
+    parser.add_argument("--mongo", choices=["auto", "mongod", "inmemory"], default="auto",
+                        help="Local Mongo stand-in when --mongo-url is not given")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=5, help="Scenario repetitions per user")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to save the JSON report")
+    parser.add_argument("--baseline", help="Previous report to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 slowdown vs baseline (0.2 = 20%%)")
+    parser.add_argument("--events", action="store_true", help="Also hold an /api/events stream per user")
+    parser.add_argument("--events-source", choices=["local", "changestream"], default="local",
+                        help="EVENTS_SOURCE for the local server (changestream starts a replica set)")
+    parser.add_argument("--serve-inmemory", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_inmemory:
+        serve_inmemory(args.serve_inmemory)
+        return 0
+
+    report = asyncio.run(run_benchmark(args))
+    print_report(report)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_with_baseline(report, json.load(f), args.tolerance)
+        if regressions:
+            print("\n❌ Latency regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\n✅ No p95 regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
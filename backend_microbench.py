@@ -0,0 +1,229 @@
+"""Microbenchmarks for the CPU-bound hot paths in backend/server.py.
+
+Runs fully offline: Motor is never connected (the database handle is
+replaced by a stub that fails loudly if touched) and resend.Emails.send is
+stubbed, so only local CPU cost is measured.
+
+    python backend_microbench.py                         # run everything
+    python backend_microbench.py -k token -k profile     # only matching benchmarks
+    python backend_microbench.py --save-baseline microbench_baseline.json
+    python backend_microbench.py --compare microbench_baseline.json
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+
+ROOT_DIR = Path(__file__).parent
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+
+# Motor connects lazily, so an unreachable URL keeps the import offline
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1/")
+os.environ.setdefault("DB_NAME", "microbench")
+
+import jwt  # noqa: E402
+import resend  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+import server  # noqa: E402
+
+
+class OfflineDatabase:
+    """Stands in for the Motor database; benchmarks must not reach Mongo"""
+
+    def __getattr__(self, name):
+        raise RuntimeError(f"benchmark touched db.{name}")
+
+    __getitem__ = __getattr__
+
+
+server.db = OfflineDatabase()
+resend.Emails.send = staticmethod(lambda params: {"id": "stub"})
+
+
+def quiz_answers() -> List[server.QuizAnswer]:
+    return [server.QuizAnswer(question_number=n, answer=a) for n, a in zip(range(1, 11), "abcadbabaa")]
+
+
+def news_docs(count: int) -> List[dict]:
+    now = datetime.now(timezone.utc).isoformat()
+    return [{
+        "id": str(uuid.uuid4()),
+        "title": f"News {i}",
+        "description": "Scopri quale tipo di allenatore sei! " * 4,
+        "news_type": "announcement",
+        "is_active": True,
+        "created_at": now,
+        "size": "normal"
+    } for i in range(count)]
+
+
+def user_pokemon_docs(count: int) -> List[dict]:
+    now = datetime.now(timezone.utc).isoformat()
+    return [{
+        "id": str(uuid.uuid4()),
+        "user_id": str(uuid.uuid4()),
+        "pokemon_id": i + 1,
+        "pokemon_name": f"pokemon-{i + 1}",
+        "assigned_at": now
+    } for i in range(count)]
+
+
+def user_docs(count: int) -> List[dict]:
+    now = datetime.now(timezone.utc).isoformat()
+    return [{
+        "id": str(uuid.uuid4()),
+        "username": f"allenatore{i}",
+        "email": f"allenatore{i}@example.com",
+        "created_at": now
+    } for i in range(count)]
+
+
+def default_response(adapter: TypeAdapter, docs: List[dict]) -> bytes:
+    """What FastAPI does for a response_model: validate, dump, jsonable_encoder, json.dumps"""
+    content = docs if adapter is None else adapter.dump_python(adapter.validate_python(docs), mode="json")
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def build_benchmarks() -> dict:
+    """name -> (callable, calls per sample)"""
+    answers = quiz_answers()
+    pairs = server.answer_pairs(answers)
+    sheets = [pairs] * 1000
+    result = server.calculate_profile(answers)
+    token = server.create_token(str(uuid.uuid4()))
+    hashed = server.hash_password("TestPassword123!")
+    news_adapter = TypeAdapter(List[server.NewsItem])
+    pokemon_adapter = TypeAdapter(List[server.UserPokemon])
+    news_100 = news_docs(100)
+    pokemon_100 = user_pokemon_docs(100)
+
+    benchmarks = {
+        "calculate_profile": (lambda: server.calculate_profile(answers), 2000),
+        "quiz_scorer.score_many[1000]": (lambda: server.quiz_scorer.score_many(sheets), 20),
+        "create_token": (lambda: server.create_token("user-id"), 2000),
+        "jwt.decode": (lambda: jwt.decode(token, server.JWT_SECRET, algorithms=[server.JWT_ALGORITHM]), 2000),
+        "decode_token[cached]": (lambda: server.decode_token(token), 20000),
+        "hash_password": (lambda: server.hash_password("TestPassword123!"), 1),
+        "verify_password": (lambda: server.verify_password("TestPassword123!", hashed), 1),
+        "build_quiz_email": (lambda: server.build_quiz_email("ash@example.com", "ash", answers, result), 2000),
+        "validate List[NewsItem][100]": (lambda: news_adapter.validate_python(news_100), 200),
+        "validate List[UserPokemon][100]": (lambda: pokemon_adapter.validate_python(pokemon_100), 200),
+    }
+    
+    # List responses: FastAPI's default path vs FastJSONResponse (FAST_JSON_RESPONSES=true)
+    for size, number in ((100, 200), (1000, 20)):
+        news = news_docs(size)
+        users = user_docs(size)
+        benchmarks.update({
+            f"response default List[NewsItem][{size}]": (lambda d=news: default_response(news_adapter, d), number),
+            f"response fast List[NewsItem][{size}]": (lambda d=news: server.FastJSONResponse(d).body, number),
+            f"response default admin users[{size}]": (lambda d=users: default_response(None, d), number),
+            f"response fast admin users[{size}]": (lambda d=users: server.FastJSONResponse(d).body, number),
+        })
+    return benchmarks
+
+
+def measure(fn, number: int, repeat: int, warmup: int) -> dict:
+    """Per-call timings in microseconds over `repeat` samples of `number` calls"""
+    for _ in range(warmup):
+        for _ in range(number):
+            fn()
+
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter_ns()
+            for _ in range(number):
+                fn()
+            samples.append((time.perf_counter_ns() - started) / number / 1000)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    samples.sort()
+    return {
+        "calls_per_sample": number,
+        "samples": repeat,
+        "min_us": round(samples[0], 3),
+        "median_us": round(statistics.median(samples), 3),
+        "mean_us": round(statistics.fmean(samples), 3),
+        "stdev_us": round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+        "p95_us": round(samples[min(len(samples) - 1, int(0.95 * len(samples)))], 3),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Benchmarks whose median got slower than the baseline by more than tolerance"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        change = current["median_us"] / previous["median_us"] - 1
+        marker = "❌" if change > tolerance else "  "
+        print(f"{marker} {name:<40} {previous['median_us']:>12.2f} -> {current['median_us']:>12.2f} us ({change:+.1%})")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for server.py hot functions")
+    parser.add_argument("-k", dest="filters", action="append", default=[], help="Only run benchmarks containing this text")
+    parser.add_argument("--repeat", type=int, default=15, help="Samples per benchmark")
+    parser.add_argument("--warmup", type=int, default=2, help="Warmup samples discarded before measuring")
+    parser.add_argument("--output", help="Save results as JSON")
+    parser.add_argument("--save-baseline", help="Save results as the new baseline")
+    parser.add_argument("--compare", help="Baseline to compare medians against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed slowdown vs baseline (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    benchmarks = build_benchmarks()
+    if args.filters:
+        benchmarks = {name: b for name, b in benchmarks.items() if any(f in name for f in args.filters)}
+
+    print(f"{'Benchmark':<40} {'median':>12} {'mean':>12} {'stdev':>10} {'p95':>12}  (us per call)")
+    print("-" * 92)
+    results = {}
+    for name, (fn, number) in benchmarks.items():
+        # bcrypt is ~100x slower than everything else; fewer samples keep the run short
+        repeat = max(3, args.repeat // 3) if number == 1 else args.repeat
+        stats = measure(fn, number, repeat, args.warmup if number > 1 else 1)
+        results[name] = stats
+        print(f"{name:<40} {stats['median_us']:>12.2f} {stats['mean_us']:>12.2f} {stats['stdev_us']:>10.2f} {stats['p95_us']:>12.2f}")
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📄 Results saved to {path}")
+
+    if args.compare:
+        print()
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} benchmark(s) slower than baseline")
+            return 1
+        print("\n✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
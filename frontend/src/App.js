@@ -17,6 +17,44 @@ import PokemonDetailPage from "./pages/PokemonDetailPage";
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 export const API = `${BACKEND_URL}/api`;
 
+// Server-sent events. The stream URL carries a short-lived stream token, never the
+// session token, so every (re)connection first asks for a fresh one.
+export const subscribeEvents = (token, handlers) => {
+  let events = null;
+  let retry = null;
+  let closed = false;
+
+  const reconnect = () => {
+    if (events) events.close();
+    if (!closed) retry = setTimeout(connect, 5000);
+  };
+
+  const connect = async () => {
+    try {
+      const response = await axios.post(`${API}/events/token`, null, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      if (closed) return;
+      events = new EventSource(`${API}/events?token=${encodeURIComponent(response.data.token)}`);
+      for (const [name, handler] of Object.entries(handlers)) {
+        events.addEventListener(name, handler);
+      }
+      // The browser would retry with the same, soon expired, stream token
+      events.onerror = reconnect;
+      events.addEventListener("expired", reconnect);
+    } catch (error) {
+      if (error.response?.status !== 401) reconnect();
+    }
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    clearTimeout(retry);
+    if (events) events.close();
+  };
+};
+
 // Auth Context
 const AuthContext = createContext(null);
 
@@ -50,6 +50,21 @@ import {
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Admin lists are paginated: follow X-Next-Cursor until the last page
+const fetchAllPages = async (url, authToken) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const response = await axios.get(url, {
+      headers: { Authorization: `Bearer ${authToken}` },
+      params: cursor ? { cursor } : {}
+    });
+    items.push(...response.data);
+    cursor = response.headers["x-next-cursor"];
+  } while (cursor);
+  return items;
+};
+
 export default function AdminPage() {
   const [isLoggedIn, setIsLoggedIn] = useState(false);
   const [token, setToken] = useState(localStorage.getItem("adminToken"));
@@ -91,10 +106,7 @@ export default function AdminPage() {
 
   const validateToken = async () => {
     try {
-      const response = await axios.get(`${API}/admin/news`, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
-      setNews(response.data);
+      setNews(await fetchAllPages(`${API}/admin/news`, token));
       setIsLoggedIn(true);
       fetchUsers();
     } catch (error) {
@@ -135,10 +147,7 @@ export default function AdminPage() {
 
   const fetchNews = async (authToken = token) => {
     try {
-      const response = await axios.get(`${API}/admin/news`, {
-        headers: { Authorization: `Bearer ${authToken}` }
-      });
-      setNews(response.data);
+      setNews(await fetchAllPages(`${API}/admin/news`, authToken));
     } catch (error) {
       toast.error("Errore nel caricamento delle news");
     }
@@ -146,10 +155,7 @@ export default function AdminPage() {
 
   const fetchUsers = async (authToken = token) => {
     try {
-      const response = await axios.get(`${API}/admin/users`, {
-        headers: { Authorization: `Bearer ${authToken}` }
-      });
-      setUsers(response.data);
+      setUsers(await fetchAllPages(`${API}/admin/users`, authToken));
     } catch (error) {
       console.error("Error fetching users:", error);
     }
@@ -249,16 +255,11 @@ export default function AdminPage() {
     
     setSearchingPokemon(true);
     try {
-      // Search Pokemon from PokeAPI
-      const response = await axios.get(`https://pokeapi.co/api/v2/pokemon?limit=1025`);
-      const filtered = response.data.results
-        .filter(p => p.name.toLowerCase().includes(query.toLowerCase()))
-        .slice(0, 10)
-        .map((p, index) => {
-          const id = parseInt(p.url.split('/').filter(Boolean).pop());
-          return { id, name: p.name };
-        });
-      setPokemonResults(filtered);
+      // Ranked, typo-tolerant search on the server (also matches Italian names)
+      const response = await axios.get(`${API}/pokemon/search`, {
+        params: { q: query, limit: 10 }
+      });
+      setPokemonResults(response.data.results);
     } catch (error) {
       console.error("Error searching pokemon:", error);
     } finally {
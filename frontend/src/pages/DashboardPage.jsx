@@ -1,6 +1,6 @@
 import { useState, useEffect, useRef } from "react";
 import { useNavigate } from "react-router-dom";
-import { useAuth, API } from "../App";
+import { useAuth, API, subscribeEvents } from "../App";
 import { Button } from "../components/ui/button";
 import {
   AlertDialog,
@@ -23,6 +23,9 @@ import { toast } from "sonner";
 import axios from "axios";
 import { LogOut, Scroll, Bell, ChevronRight, User, Sparkles, Clock, Star, ChevronDown, Gamepad2 } from "lucide-react";
 
+// Last dashboard payload, kept across navigations for per-section revalidation
+let dashboardCache = { token: null, sections: {} };
+
 export default function DashboardPage() {
   const [news, setNews] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -32,16 +35,37 @@ export default function DashboardPage() {
   const { user, token, logout } = useAuth();
 
   useEffect(() => {
-    fetchNews();
-    fetchQuizHistory();
+    fetchDashboard();
   }, [token]);
 
-  const fetchNews = async () => {
+  // Reload when news or our pokemon change instead of polling
+  useEffect(() => {
+    if (!token) return;
+    return subscribeEvents(token, {
+      news: fetchDashboard,
+      pokemon: fetchDashboard,
+      reset: fetchDashboard
+    });
+  }, [token]);
+
+  const fetchDashboard = async () => {
     try {
-      const response = await axios.get(`${API}/news`, {
-        headers: { Authorization: `Bearer ${token}` }
+      // Sections we already hold are sent back as ETags; unchanged ones return without items
+      const cached = dashboardCache.token === token ? dashboardCache.sections : {};
+      const etags = Object.values(cached).map((section) => section.etag);
+      const response = await axios.get(`${API}/dashboard`, {
+        headers: {
+          Authorization: `Bearer ${token}`,
+          ...(etags.length > 0 && { "If-None-Match": etags.join(", ") })
+        }
       });
-      setNews(response.data);
+      const sections = {};
+      for (const [name, section] of Object.entries(response.data)) {
+        sections[name] = section.not_modified ? cached[name] : section;
+      }
+      dashboardCache = { token, sections };
+      setNews(sections.news.items);
+      setQuizHistory(sections.quiz_history.items);
     } catch (error) {
       toast.error("Errore nel caricamento delle news");
     } finally {
@@ -49,17 +73,6 @@ export default function DashboardPage() {
     }
   };
 
-  const fetchQuizHistory = async () => {
-    try {
-      const response = await axios.get(`${API}/quiz/history`, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
-      setQuizHistory(response.data);
-    } catch (error) {
-      console.error("Error fetching quiz history:", error);
-    }
-  };
-
   // Check if user has completed the questionnaire
   const hasCompletedQuiz = quizHistory.length > 0;
 
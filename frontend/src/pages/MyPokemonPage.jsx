@@ -1,6 +1,6 @@
 import { useState, useEffect } from "react";
 import { useNavigate } from "react-router-dom";
-import { useAuth, API } from "../App";
+import { useAuth, API, subscribeEvents } from "../App";
 import { Button } from "../components/ui/button";
 import { toast } from "sonner";
 import axios from "axios";
@@ -17,6 +17,15 @@ export default function MyPokemonPage() {
     fetchMyPokemon();
   }, [token]);
 
+  // Reload when the admin assigns or removes one of our pokemon
+  useEffect(() => {
+    if (!token) return;
+    return subscribeEvents(token, {
+      pokemon: fetchMyPokemon,
+      reset: fetchMyPokemon
+    });
+  }, [token]);
+
   const fetchMyPokemon = async () => {
     try {
       const response = await axios.get(`${API}/pokemon/my`, {
@@ -1,6 +1,6 @@
 import { useState, useEffect } from "react";
 import { useNavigate, useParams } from "react-router-dom";
-import { useAuth } from "../App";
+import { useAuth, API } from "../App";
 import { toast } from "sonner";
 import axios from "axios";
 import { ArrowLeft, Zap, Shield, Swords, Heart, Wind, Target, Disc, GraduationCap, Info } from "lucide-react";
@@ -180,45 +180,24 @@ export default function PokemonDetailPage() {
 
   const fetchPokemonData = async () => {
     try {
-      // Fetch Pokemon data from PokeAPI
-      const pokemonRes = await axios.get(`https://pokeapi.co/api/v2/pokemon/${pokemonId}`);
-      setPokemon(pokemonRes.data);
-
-      // Fetch species for Italian name
-      const speciesRes = await axios.get(pokemonRes.data.species.url);
-      setSpecies(speciesRes.data);
-
-      // Try to find moves from available version groups
-      let foundMoves = false;
-      let usedVersionGroup = null;
-
-      for (const versionGroup of VERSION_GROUPS) {
-        const { levelUpMoves, machineMoves } = filterMovesByVersion(
-          pokemonRes.data.moves,
-          versionGroup.name
-        );
-
-        if (levelUpMoves.length > 0 || machineMoves.length > 0) {
-          foundMoves = true;
-          usedVersionGroup = versionGroup;
-
-          // Sort level-up moves by level
-          levelUpMoves.sort((a, b) => a.level - b.level);
-
-          // Fetch move details for level-up moves
-          const levelMoveDetails = await fetchMoveDetails(levelUpMoves.slice(0, 50), true);
-          
-          // Fetch move details for TM moves
-          const tmMoveDetails = await fetchMoveDetails(machineMoves.slice(0, 60), false, versionGroup.name);
-
-          setLevelMoves(levelMoveDetails);
-          setTmMoves(tmMoveDetails);
-          setDataSource(versionGroup);
-          break;
-        }
-      }
-
-      if (!foundMoves) {
+      // Single prebuilt document: Pokemon, species and moves with TM/HM data
+      const response = await axios.get(`${API}/pokemon/${pokemonId}/detail`);
+      const detail = response.data;
+      setPokemon(detail.pokemon);
+      setSpecies(detail.species);
+
+      // Use the first version group (newest first) that has any moves
+      const versionGroup = VERSION_GROUPS.find(vg => {
+        const moveSet = detail.move_sets[vg.name];
+        return moveSet && (moveSet.level_up.length > 0 || moveSet.machine.length > 0);
+      });
+
+      if (versionGroup) {
+        const moveSet = detail.move_sets[versionGroup.name];
+        setLevelMoves(moveSet.level_up.slice(0, 50));
+        setTmMoves(moveSet.machine.slice(0, 60));
+        setDataSource(versionGroup);
+      } else {
         setLevelMoves([]);
         setTmMoves([]);
         setDataSource(null);
@@ -231,73 +210,6 @@ export default function PokemonDetailPage() {
     }
   };
 
-  const filterMovesByVersion = (moves, versionGroupName) => {
-    const levelUpMoves = [];
-    const machineMoves = [];
-
-    moves.forEach(move => {
-      const versionDetails = move.version_group_details.find(vgd => 
-        vgd.version_group.name === versionGroupName
-      );
-      
-      if (versionDetails) {
-        if (versionDetails.move_learn_method.name === "level-up") {
-          levelUpMoves.push({
-            ...move,
-            level: versionDetails.level_learned_at
-          });
-        } else if (versionDetails.move_learn_method.name === "machine") {
-          machineMoves.push(move);
-        }
-      }
-    });
-
-    return { levelUpMoves, machineMoves };
-  };
-
-  const fetchMoveDetails = async (moves, isLevelUp, versionGroupName = null) => {
-    const moveDetails = await Promise.all(
-      moves.map(async (move) => {
-        try {
-          const moveRes = await axios.get(move.move.url);
-          const italianName = moveRes.data.names.find(n => n.language.name === "it")?.name || moveRes.data.name;
-          
-          let tmNumber = null;
-          if (!isLevelUp && versionGroupName) {
-            // Try to get TM number from machines
-            const versionMachine = moveRes.data.machines.find(m => 
-              m.version_group.name === versionGroupName
-            );
-            if (versionMachine) {
-              try {
-                const machineRes = await axios.get(versionMachine.machine.url);
-                const itemName = machineRes.data.item.name;
-                const match = itemName.match(/tm(\d+)/i);
-                if (match) tmNumber = match[1];
-              } catch {}
-            }
-          }
-
-          return {
-            name: italianName,
-            englishName: moveRes.data.name,
-            type: moveRes.data.type.name,
-            power: moveRes.data.power,
-            accuracy: moveRes.data.accuracy,
-            pp: moveRes.data.pp,
-            damageClass: moveRes.data.damage_class.name,
-            level: isLevelUp ? move.level : null,
-            tmNumber: tmNumber
-          };
-        } catch {
-          return null;
-        }
-      })
-    );
-
-    return moveDetails.filter(m => m !== null);
-  };
-
   const getTypeColor = (type) => {
     const colors = {
       normal: "#A8A878", fire: "#F08030", water: "#6890F0", electric: "#F8D030",
@@ -0,0 +1,72 @@
+import pytest
+
+import server
+from server import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(server.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entries_expire(clock):
+    cache = TTLCache(10, 60)
+    cache.set("a", 1)
+    clock[0] += 59
+    assert cache.get("a") == 1
+    clock[0] += 1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_ttl_can_only_shorten(clock):
+    cache = TTLCache(10, 60)
+    cache.set("short", 1, ttl=5)
+    cache.set("long", 2, ttl=600)
+    cache.set("expired", 3, ttl=-1)
+    clock[0] += 5
+    assert cache.get("short") is None
+    assert cache.get("expired") is None
+    clock[0] += 54
+    assert cache.get("long") == 2
+    clock[0] += 1
+    assert cache.get("long") is None
+
+
+def test_least_recently_used_is_evicted(clock):
+    cache = TTLCache(2, 60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_invalidate_and_clear(clock):
+    cache = TTLCache(10, 60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.invalidate("a")
+    cache.invalidate("missing")
+    assert cache.get("a") is None and len(cache) == 1
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_disabled_cache_stores_nothing(clock):
+    cache = TTLCache(0, 60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    cache = TTLCache(10, 0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_invalidate_user_drops_the_cached_document(clock):
+    server.user_cache.set("u1", {"id": "u1"})
+    server.invalidate_user("u1")
+    assert server.user_cache.get("u1") is None
@@ -0,0 +1,81 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+import server
+from server import BulkPokemonAssign, mark_insert_errors
+
+
+def bulk_error(*write_errors):
+    return BulkWriteError({"writeErrors": list(write_errors), "nInserted": 0})
+
+
+def test_write_errors_map_to_outcomes():
+    results = [{"status": "assigned"} for _ in range(3)]
+    mark_insert_errors(bulk_error(
+        {"index": 0, "code": 11000, "errmsg": "E11000 duplicate key error"},
+        {"index": 2, "code": 121, "errmsg": "Document failed validation"},
+    ), results)
+    assert results == [
+        {"status": "duplicate"},
+        {"status": "assigned"},
+        {"status": "error", "detail": "Document failed validation"},
+    ]
+
+
+class FakeUsers:
+    def __init__(self, ids):
+        self.ids = ids
+
+    async def find(self, query, projection):
+        for user_id in query["id"]["$in"]:
+            if user_id in self.ids:
+                yield {"id": user_id}
+
+
+class FakeUserPokemon:
+    def __init__(self, duplicates):
+        self.duplicates = duplicates
+        self.inserted = []
+
+    async def insert_many(self, docs, ordered):
+        errors = []
+        for index, doc in enumerate(docs):
+            if (doc["user_id"], doc["pokemon_id"]) in self.duplicates:
+                errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key error"})
+            else:
+                self.inserted.append(doc)
+        if errors:
+            raise bulk_error(*errors)
+
+
+@pytest.fixture
+def user_pokemon(monkeypatch):
+    collection = FakeUserPokemon(duplicates={("u1", 4)})
+    monkeypatch.setattr(server, "db", SimpleNamespace(users=FakeUsers({"u1", "u2"}), user_pokemon=collection))
+    return collection
+
+
+@pytest.fixture
+def notified(monkeypatch):
+    channels = []
+    monkeypatch.setattr(server.event_broker, "notify", lambda channel, event, data: channels.append(channel))
+    return channels
+
+
+def test_bulk_assign_reports_each_item(user_pokemon, notified):
+    items = [
+        {"user_id": "u1", "pokemon_id": 1, "pokemon_name": "bulbasaur"},
+        {"user_id": "u1", "pokemon_id": 4, "pokemon_name": "charmander"},
+        {"user_id": "u2", "pokemon_id": 1, "pokemon_name": "bulbasaur"},
+        {"user_id": "u2", "pokemon_id": 1, "pokemon_name": "bulbasaur"},
+        {"user_id": "missing", "pokemon_id": 7, "pokemon_name": "squirtle"},
+    ]
+    response = asyncio.run(server.bulk_assign_pokemon(BulkPokemonAssign(items=items), admin={}))
+    assert [result["status"] for result in response["results"]] == \
+        ["assigned", "duplicate", "assigned", "duplicate", "user_not_found"]
+    assert response["summary"] == {"assigned": 2, "duplicate": 2, "user_not_found": 1}
+    assert [(doc["user_id"], doc["pokemon_id"]) for doc in user_pokemon.inserted] == [("u1", 1), ("u2", 1)]
+    assert notified == ["user:u1", "user:u2"]
@@ -0,0 +1,24 @@
+from pymongo.errors import DuplicateKeyError
+
+from server import duplicate_key_field
+
+
+def test_field_from_key_pattern():
+    error = DuplicateKeyError("E11000 duplicate key error", 11000,
+                              {"keyPattern": {"email": 1}, "keyValue": {"email": "ash@kanto.it"}})
+    assert duplicate_key_field(error) == "email"
+
+
+def test_first_field_of_a_compound_index():
+    write_error = {"index": 0, "code": 11000, "keyPattern": {"user_id": 1, "pokemon_id": 1}}
+    assert duplicate_key_field(write_error) == "user_id"
+
+
+def test_field_from_the_message_of_older_servers():
+    message = "E11000 duplicate key error collection: academy.users index: username_unique dup key: { : \"ash\" }"
+    assert duplicate_key_field(DuplicateKeyError(message, 11000, {})) == "username"
+    assert duplicate_key_field({"code": 11000, "errmsg": message.replace("username", "email")}) == "email"
+
+
+def test_unknown_index():
+    assert duplicate_key_field({"code": 11000, "errmsg": "E11000 duplicate key error"}) is None
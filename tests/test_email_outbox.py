@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import server
+from server import EmailOutbox
+
+
+class FakeOutboxCollection:
+    def __init__(self):
+        self.updates = []
+
+    async def update_one(self, query, update):
+        self.updates.append((query, update))
+
+
+class FakeTransport:
+    def __init__(self, error=None):
+        self.error = error
+        self.sent = []
+
+    async def send(self, message):
+        if self.error:
+            raise self.error
+        self.sent.append(message)
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = FakeOutboxCollection()
+    monkeypatch.setattr(server, "db", SimpleNamespace(email_outbox=collection))
+    return collection
+
+
+def make_outbox(transport, max_attempts=4):
+    return EmailOutbox(transport, batch_size=10, concurrency=2, max_attempts=max_attempts,
+                       backoff_seconds=30, poll_seconds=1)
+
+
+def entry(attempts):
+    return {"id": "e1", "claim_id": "c1", "attempts": attempts, "message": {"subject": "Risultati"}}
+
+
+def scheduled_delay(update):
+    next_attempt = datetime.fromisoformat(update["$set"]["next_attempt_at"])
+    return (next_attempt - datetime.now(timezone.utc)).total_seconds()
+
+
+def test_sent_entries_get_a_sent_at_date(collection):
+    transport = FakeTransport()
+    outbox = make_outbox(transport)
+    asyncio.run(outbox._deliver(entry(1)))
+    query, update = collection.updates[0]
+    assert transport.sent == [{"subject": "Risultati"}]
+    assert query == {"id": "e1", "claim_id": "c1"}
+    assert update["$set"]["status"] == "sent"
+    assert isinstance(update["$set"]["sent_at"], datetime)
+    assert update["$unset"] == {"claim_id": ""}
+    assert (outbox.sent, outbox.failed) == (1, 0)
+
+
+@pytest.mark.parametrize("attempts, delay", [(1, 30), (2, 60), (3, 120)])
+def test_failures_back_off_exponentially(collection, attempts, delay):
+    outbox = make_outbox(FakeTransport(RuntimeError("smtp down")))
+    asyncio.run(outbox._deliver(entry(attempts)))
+    _, update = collection.updates[0]
+    assert update["$set"]["status"] == "pending"
+    assert update["$set"]["last_error"] == "smtp down"
+    assert delay - 5 < scheduled_delay(update) <= delay
+    assert (outbox.failed, outbox.dead) == (1, 0)
+
+
+def test_backoff_is_capped_at_an_hour(collection):
+    outbox = make_outbox(FakeTransport(RuntimeError("smtp down")), max_attempts=20)
+    asyncio.run(outbox._deliver(entry(10)))
+    assert 3595 < scheduled_delay(collection.updates[0][1]) <= 3600
+
+
+def test_last_attempt_is_dead_lettered(collection):
+    outbox = make_outbox(FakeTransport(RuntimeError("smtp down")), max_attempts=4)
+    asyncio.run(outbox._deliver(entry(4)))
+    _, update = collection.updates[0]
+    assert update["$set"] == {"status": "dead", "last_error": "smtp down"}
+    assert (outbox.failed, outbox.dead) == (1, 1)
@@ -0,0 +1,56 @@
+import json
+
+from server import EventBroker
+
+
+def drain(subscription):
+    messages = []
+    while not subscription.queue.empty():
+        messages.append(subscription.queue.get_nowait())
+    return messages
+
+
+def test_channels_reach_only_their_subscribers():
+    broker = EventBroker("local", queue_size=8)
+    ash = broker.subscribe(["broadcast", "user:ash"])
+    misty = broker.subscribe(["broadcast", "user:misty"])
+    broker.publish("broadcast", "news", {"title": "Benvenuti"})
+    broker.publish("user:ash", "pokemon", {"pokemon_id": 25})
+    assert len(drain(ash)) == 2
+    [message] = drain(misty)
+    assert message.startswith(b"id: 1\nevent: news\ndata: ")
+    assert json.loads(message.split(b"data: ")[1]) == {"title": "Benvenuti"}
+
+
+def test_full_queue_marks_the_subscription_overflowed():
+    broker = EventBroker("local", queue_size=2)
+    slow = broker.subscribe(["broadcast"])
+    fast = broker.subscribe(["broadcast"])
+    for n in range(2):
+        broker.publish("broadcast", "news", {"n": n})
+    drain(fast)
+    broker.publish("broadcast", "news", {"n": 2})
+    broker.publish("broadcast", "news", {"n": 3})
+    assert slow.overflowed and not fast.overflowed
+    assert broker.dropped == 1
+    assert slow.queue.qsize() == 2
+    assert len(drain(fast)) == 2
+
+
+def test_unsubscribe_drops_empty_channels():
+    broker = EventBroker("local", queue_size=2)
+    subscription = broker.subscribe(["broadcast", "user:ash"])
+    assert broker.connections == 1
+    broker.unsubscribe(subscription)
+    broker.unsubscribe(subscription)
+    assert broker.connections == 0 and broker._channels == {}
+    broker.publish("broadcast", "news", {})
+    assert broker.published == 1 and subscription.queue.empty()
+
+
+def test_notify_is_ignored_when_the_change_stream_publishes():
+    local, stream = EventBroker("local", 2), EventBroker("changestream", 2)
+    subscriptions = [local.subscribe(["broadcast"]), stream.subscribe(["broadcast"])]
+    local.notify("broadcast", "news", {})
+    stream.notify("broadcast", "news", {})
+    assert [s.queue.qsize() for s in subscriptions] == [1, 0]
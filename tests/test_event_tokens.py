@@ -0,0 +1,29 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+import server
+from server import EVENTS_TOKEN_SECONDS, create_events_token, decode_token
+
+
+def test_stream_token_is_short_lived_and_scoped():
+    payload = decode_token(create_events_token("u1", 2000000000))
+    assert payload["sub"] == "u1" and payload["scope"] == "events"
+    assert payload["session_exp"] == 2000000000
+    assert 0 < payload["exp"] - time.time() <= EVENTS_TOKEN_SECONDS
+
+
+def test_stream_token_does_not_authenticate_api_calls():
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_events_token("u1", None))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(server.get_current_user(credentials))
+    assert error.value.status_code == 401
+
+
+def test_events_stream_refuses_session_tokens():
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(server.stream_events(token=server.create_token("u1")))
+    assert error.value.status_code == 401
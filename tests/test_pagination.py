@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from server import decode_cursor, encode_cursor, fetch_page
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, sort):
+        self.docs = sorted(self.docs, key=lambda doc: tuple(doc[field] for field, _ in sort))
+        return self
+
+    def limit(self, limit):
+        self.docs = self.docs[:limit]
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class FakeCollection:
+    """Records the query and applies the keyset clauses built by fetch_page"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query, projection=None, collation=None):
+        self.queries.append(query)
+        return FakeCursor([doc for doc in self.docs if self.matches(doc, query)])
+
+    def matches(self, doc, query):
+        for key, value in query.items():
+            if key == "$and":
+                if not all(self.matches(doc, clause) for clause in value):
+                    return False
+            elif key == "$or":
+                if not any(self.matches(doc, clause) for clause in value):
+                    return False
+            elif isinstance(value, dict):
+                if not doc[key] > value["$gt"]:
+                    return False
+            elif doc[key] != value:
+                return False
+        return True
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_cursor_round_trip():
+    values = ["2024-01-01T00:00:00+00:00", "abc", 3, 1.5, None]
+    assert decode_cursor(encode_cursor(values), len(values)) == values
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64 at all!",
+    encode_cursor(["only one"]),
+    encode_cursor({"created_at": "x", "id": "y"}),
+    encode_cursor([{"$ne": None}, "x"]),
+    encode_cursor([["x"], "y"]),
+])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, 2)
+    assert error.value.status_code == 400
+
+
+def test_keyset_query():
+    collection = FakeCollection([])
+    run(fetch_page(collection, {"user_id": "u1"}, ["created_at", "id"], 10, encode_cursor(["2024", "b"])))
+    assert collection.queries[0] == {"$and": [
+        {"user_id": "u1"},
+        {"$or": [{"created_at": {"$gt": "2024"}}, {"created_at": "2024", "id": {"$gt": "b"}}]},
+    ]}
+
+
+def test_pages_cover_every_document_once():
+    docs = [{"created_at": f"2024-01-0{day}", "id": f"n{i}"} for day in range(1, 4) for i in range(3)]
+    collection = FakeCollection(docs)
+    seen, cursor = [], None
+    while True:
+        items, cursor = run(fetch_page(collection, {}, ["created_at", "id"], 4, cursor))
+        seen += items
+        if cursor is None:
+            break
+    assert seen == sorted(docs, key=lambda doc: (doc["created_at"], doc["id"]))
+    assert len(collection.queries) == 3
+
+
+def test_last_full_page_has_no_cursor():
+    collection = FakeCollection([{"created_at": "2024", "id": str(i)} for i in range(4)])
+    items, cursor = run(fetch_page(collection, {}, ["created_at", "id"], 4))
+    assert len(items) == 4 and cursor is None
@@ -0,0 +1,74 @@
+import pytest
+
+from server import PokemonSearchIndex, SEARCH_MAX_RESULTS
+
+
+ENTRIES = [
+    {"id": 1, "name": "bulbasaur", "types": ["grass", "poison"], "names": {"fr": "Bulbizarre", "ja": "Fushigidane"}},
+    {"id": 6, "name": "charizard", "types": ["fire", "flying"], "names": {"de": "Glurak", "fr": "Dracaufeu"}},
+    {"id": 25, "name": "pikachu", "types": ["electric"], "names": {"fr": "Pikachu"}},
+    {"id": 26, "name": "raichu", "types": ["electric"], "names": {}},
+    {"id": 172, "name": "pichu", "types": ["electric"], "names": {}},
+    {"id": 669, "name": "flabebe", "types": ["fairy"], "names": {"fr": "Flabébé"}},
+    {"id": 122, "name": "mr-mime", "types": ["psychic", "fairy"], "names": {"en": "Mr. Mime"}},
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return PokemonSearchIndex(ENTRIES)
+
+
+def matches(results):
+    return [(result["name"], result["match"]) for result in results]
+
+
+def test_normalize_strips_case_accents_and_punctuation():
+    assert PokemonSearchIndex.normalize("Flabébé") == "flabebe"
+    assert PokemonSearchIndex.normalize("Mr. Mime") == "mrmime"
+    assert PokemonSearchIndex.normalize(" - ") == ""
+
+
+def test_bigrams_mark_the_start_of_the_name():
+    assert PokemonSearchIndex.bigrams("pika") == {"^p", "pi", "ik", "ka"}
+
+
+def test_prefix_distance():
+    assert PokemonSearchIndex.prefix_distance("pika", "pikachu", 2) == 0
+    assert PokemonSearchIndex.prefix_distance("pkia", "pikachu", 2) == 2
+    assert PokemonSearchIndex.prefix_distance("xyzw", "pikachu", 1) == 2
+
+
+def test_exact_before_prefix(index):
+    assert matches(index.search("pichu")) == [("pichu", "exact")]
+    assert matches(index.search("pi")) == [("pichu", "prefix"), ("pikachu", "prefix")]
+
+
+def test_accents_and_localized_names(index):
+    assert matches(index.search("FLABÉBÉ")) == [("flabebe", "exact")]
+    result = index.search("glurak")[0]
+    assert (result["name"], result["matched_name"], result["language"]) == ("charizard", "Glurak", "de")
+
+
+def test_substring(index):
+    assert matches(index.search("chu")) == [("pichu", "substring"), ("raichu", "substring"), ("pikachu", "substring")]
+
+
+def test_fuzzy(index):
+    assert matches(index.search("charzard")) == [("charizard", "fuzzy")]
+    assert index.search("xyzw") == []
+
+
+def test_empty_query(index):
+    assert index.search("") == []
+    assert index.search("!!") == []
+
+
+def test_limit_above_the_trie_node_size():
+    entries = [
+        {"id": i, "name": f"b{i:03d}", "names": {"fr": f"bf{i:03d}", "de": f"bd{i:03d}"}}
+        for i in range(SEARCH_MAX_RESULTS * 2)
+    ]
+    results = PokemonSearchIndex(entries).search("b", SEARCH_MAX_RESULTS)
+    assert len(results) == SEARCH_MAX_RESULTS
+    assert {result["match"] for result in results} == {"prefix"}
@@ -0,0 +1,40 @@
+import pytest
+from fastapi import HTTPException
+
+from server import QUIZ_EXPORT_COLUMNS, QUIZ_EXPORT_QUESTIONS, parse_export_date, quiz_export_row
+
+
+def test_dates_become_utc_timestamps():
+    assert parse_export_date("2024-03-05") == "2024-03-05T00:00:00+00:00"
+    assert parse_export_date("2024-03-05T12:30:00+02:00") == "2024-03-05T10:30:00+00:00"
+
+
+def test_bare_end_date_includes_the_whole_day():
+    assert parse_export_date("2024-03-05", end=True) == "2024-03-06T00:00:00+00:00"
+    assert parse_export_date("2024-03-05T08:00:00", end=True) == "2024-03-05T08:00:00+00:00"
+
+
+@pytest.mark.parametrize("value", ["yesterday", "2024-13-01", ""])
+def test_invalid_dates_are_rejected(value):
+    with pytest.raises(HTTPException) as error:
+        parse_export_date(value)
+    assert error.value.status_code == 400
+
+
+def test_export_row_follows_the_columns():
+    doc = {
+        "id": "q1", "user_id": "u1", "username": "ash", "email": "ash@kanto.it",
+        "submitted_at": "2024-03-05T10:00:00+00:00", "profile": "cinico", "scoring_version": "abc",
+        "result": {"profile_name": "Allenatore Cinico", "profile_type": "Tipo Buio"},
+        "answers": [{"question_number": 1, "answer": "a"}, {"question_number": 3, "answer": "c"}],
+    }
+    row = dict(zip(QUIZ_EXPORT_COLUMNS, quiz_export_row(doc)))
+    assert len(row) == len(QUIZ_EXPORT_COLUMNS)
+    assert row["profile"] == "cinico" and row["profile_name"] == "Allenatore Cinico"
+    assert (row["q1"], row["q2"], row["q3"]) == ("a", "", "c")
+
+
+def test_export_row_of_a_sparse_document():
+    row = quiz_export_row({"id": "q1"})
+    assert row[0] == "q1"
+    assert row[-QUIZ_EXPORT_QUESTIONS:] == [""] * QUIZ_EXPORT_QUESTIONS
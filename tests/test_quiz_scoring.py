@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+import server
+from server import PROFILE_DEFINITIONS, DEFAULT_PROFILE, QuizAnswer, QuizScorer
+
+
+def reference_profile(pairs):
+    """The set-intersection scorer the bitmask scorer replaced"""
+    user_answers = {f"{question}{answer}" for question, answer in pairs}
+    best_match, best_score = None, 0
+    for profile_key, profile_data in PROFILE_DEFINITIONS.items():
+        matches = len(user_answers.intersection(profile_data["answers"]))
+        if matches > best_score:
+            best_score = matches
+            best_match = profile_key
+    return best_match if best_match and best_score else DEFAULT_PROFILE
+
+
+def random_sheets(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        [(question, rng.choice("abcde")) for question in range(1, 11)]
+        for _ in range(count)
+    ]
+
+
+@pytest.fixture(scope="module")
+def scorer():
+    return QuizScorer(PROFILE_DEFINITIONS, DEFAULT_PROFILE)
+
+
+def test_score_matches_reference(scorer):
+    for pairs in random_sheets(2000):
+        assert scorer.score(pairs) == reference_profile(pairs)
+
+
+def test_score_many_matches_score(scorer):
+    sheets = random_sheets(2000, seed=11)
+    assert scorer.score_many(sheets) == [reference_profile(pairs) for pairs in sheets]
+
+
+def test_each_profile_wins_with_its_own_answers(scorer):
+    for key, data in PROFILE_DEFINITIONS.items():
+        pairs = [(int(code[:-1]), code[-1]) for code in data["answers"]]
+        assert scorer.score(pairs) == reference_profile(pairs)
+
+
+def test_unknown_answers_fall_back_to_default(scorer):
+    assert scorer.score([]) == DEFAULT_PROFILE
+    assert scorer.score([(99, "z")]) == DEFAULT_PROFILE
+    assert scorer.score_many([[], [(99, "z")]]) == [DEFAULT_PROFILE, DEFAULT_PROFILE]
+
+
+def test_calculate_profile_ignores_answer_case():
+    answers = [QuizAnswer(question_number=1, answer="A"), QuizAnswer(question_number=2, answer="B")]
+    expected = PROFILE_DEFINITIONS[reference_profile([(1, "a"), (2, "b")])]["name"]
+    assert server.calculate_profile(answers).profile_name == expected
+
+
+def edited_definitions(**changes):
+    definitions = {key: dict(data) for key, data in PROFILE_DEFINITIONS.items()}
+    definitions[DEFAULT_PROFILE].update(changes)
+    return definitions
+
+
+def test_version_follows_definitions():
+    current = QuizScorer(PROFILE_DEFINITIONS, DEFAULT_PROFILE).version
+    assert QuizScorer(edited_definitions(), DEFAULT_PROFILE).version == current
+    answers = set(PROFILE_DEFINITIONS[DEFAULT_PROFILE]["answers"]) | {"1a"}
+    assert QuizScorer(edited_definitions(answers=answers), DEFAULT_PROFILE).version != current
+
+
+@pytest.mark.parametrize("field", ["name", "type", "description"])
+def test_version_follows_profile_texts(field):
+    current = QuizScorer(PROFILE_DEFINITIONS, DEFAULT_PROFILE).version
+    edited = edited_definitions(**{field: PROFILE_DEFINITIONS[DEFAULT_PROFILE][field] + "!"})
+    assert QuizScorer(edited, DEFAULT_PROFILE).version != current
@@ -0,0 +1,35 @@
+from server import quiz_stats_update, stats_answer_re
+
+
+def quiz_doc(answers, profile="cinico", submitted_at="2024-03-05T10:00:00+00:00"):
+    return {
+        "id": "q1",
+        "profile": profile,
+        "answers": [{"question_number": number, "answer": answer} for number, answer in answers],
+        "submitted_at": submitted_at,
+    }
+
+
+def test_totals_and_day_increments():
+    totals, day = quiz_stats_update(quiz_doc([(1, "a"), (2, "B")]))
+    assert totals._filter == {"_id": "totals"}
+    assert totals._doc == {"$inc": {"submissions": 1, "profiles.cinico": 1, "answers.1.a": 1, "answers.2.b": 1}}
+    assert totals._upsert
+    assert day._filter == {"_id": "day:2024-03-05"}
+    assert day._doc == {"$set": {"date": "2024-03-05"}, "$inc": {"submissions": 1}}
+
+
+def test_repeated_answers_add_up():
+    totals, _ = quiz_stats_update(quiz_doc([(1, "a"), (1, "A")]))
+    assert totals._doc["$inc"]["answers.1.a"] == 2
+
+
+def test_only_plain_ascii_answers_become_fields():
+    # "\u212a" (Kelvin sign) lowercases to "k" in Python but not in MongoDB's $toLower
+    totals, _ = quiz_stats_update(quiz_doc([(1, "é"), (2, "a.b"), (3, "$x"), (4, ""), (5, "\u212a")]))
+    assert totals._doc["$inc"] == {"submissions": 1, "profiles.cinico": 1}
+
+
+def test_answer_pattern():
+    assert [bool(stats_answer_re.match(value)) for value in ("a", "E", "10", "é", "a b", "")] == \
+        [True, True, True, False, False, False]
@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from server import MemoryRateLimitBackend, RateLimiter
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def fake_request(ip="10.0.0.1", forwarded=None):
+    headers = {"x-forwarded-for": forwarded} if forwarded else {}
+    return SimpleNamespace(headers=headers, client=SimpleNamespace(host=ip))
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(server.time, "time", lambda: now[0])
+    monkeypatch.setattr(server, "RATE_LIMIT_IP_BURST", 3)
+    monkeypatch.setattr(server, "RATE_LIMIT_IP_PER_MINUTE", 6)
+    monkeypatch.setattr(server, "RATE_LIMIT_ACCOUNT_ATTEMPTS", 4)
+    monkeypatch.setattr(server, "RATE_LIMIT_ACCOUNT_WINDOW_SECONDS", 100)
+    monkeypatch.setattr(server, "RATE_LIMIT_TRUST_FORWARDED_FOR", False)
+    return now
+
+
+def retry_after(limiter, request, account=None):
+    with pytest.raises(HTTPException) as error:
+        run(limiter.check(request, "login", account))
+    assert error.value.status_code == 429
+    return int(error.value.headers["Retry-After"])
+
+
+def test_token_bucket_allows_a_burst_then_refills():
+    backend = MemoryRateLimitBackend()
+    waits = [run(backend.take_token("k", 2, 0.5, 0.0)) for _ in range(3)]
+    assert waits == [0.0, 0.0, 2.0]
+    assert run(backend.take_token("k", 2, 0.5, 1.0)) == 1.0
+    assert run(backend.take_token("k", 2, 0.5, 2.0)) == 0.0
+
+
+def test_window_counts_keep_the_previous_window():
+    backend = MemoryRateLimitBackend()
+    assert run(backend.window_counts("k", 60, 10.0)) == (0, 1)
+    assert run(backend.window_counts("k", 60, 20.0)) == (0, 2)
+    assert run(backend.window_counts("k", 60, 70.0)) == (2, 1)
+    assert run(backend.window_counts("k", 60, 200.0)) == (0, 1)
+
+
+def test_memory_backend_evicts_oldest_keys():
+    backend = MemoryRateLimitBackend(max_keys=2)
+    for key in ("a", "b", "c"):
+        run(backend.take_token(key, 1, 1.0, 0.0))
+    assert list(backend._buckets) == ["b", "c"]
+
+
+def test_ip_limit_sets_retry_after(limits):
+    limiter = RateLimiter(MemoryRateLimitBackend())
+    for _ in range(3):
+        run(limiter.check(fake_request(), "login"))
+    # 6 per minute refills one token every 10 seconds
+    assert retry_after(limiter, fake_request()) == 10
+    run(limiter.check(fake_request(ip="10.0.0.2"), "login"))
+    limits[0] += 10
+    run(limiter.check(fake_request(), "login"))
+
+
+def test_account_limit_uses_a_sliding_window(limits):
+    limiter = RateLimiter(MemoryRateLimitBackend())
+    limits[0] = 1000.0  # start of a 100 second window
+    for ip in range(4):
+        run(limiter.check(fake_request(ip=f"10.0.1.{ip}"), "login", "Ash@Kanto.it"))
+    assert retry_after(limiter, fake_request(ip="10.0.1.9"), "ash@kanto.it") == 100
+    # Halfway through the next window half of the 5 previous attempts still count
+    limits[0] = 1150.0
+    run(limiter.check(fake_request(ip="10.0.2.1"), "login", "ash@kanto.it"))
+    assert retry_after(limiter, fake_request(ip="10.0.2.2"), "ash@kanto.it") == 50
+
+
+def test_forwarded_for_is_only_trusted_when_enabled(limits, monkeypatch):
+    limiter = RateLimiter(None)
+    request = fake_request(ip="10.0.0.1", forwarded="203.0.113.7, 10.0.0.1")
+    assert limiter.client_ip(request) == "10.0.0.1"
+    monkeypatch.setattr(server, "RATE_LIMIT_TRUST_FORWARDED_FOR", True)
+    assert limiter.client_ip(request) == "203.0.113.7"
+
+
+def test_backend_errors_fail_open(limits):
+    class BrokenBackend:
+        async def take_token(self, *args):
+            raise RuntimeError("down")
+
+    run(RateLimiter(BrokenBackend()).check(fake_request(), "login"))
+    run(RateLimiter(None).check(fake_request(), "login"))
@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+from server import SlowQueryLog, plan_summary, query_shape, redact_plan
+
+
+class CapturingLoop:
+    def __init__(self):
+        self.records = []
+
+    def call_soon_threadsafe(self, callback, record):
+        self.records.append(record)
+
+
+def run_command(log, name, command, duration_micros=500000):
+    event = SimpleNamespace(command_name=name, command=command, connection_id=1, request_id=1,
+                            duration_micros=duration_micros)
+    log.started(event)
+    log.succeeded(event)
+
+
+def test_query_shape_hides_literals():
+    assert query_shape({"email": "ash@kanto.it", "n": {"$in": [1, 2]}, "$or": [{"a": 1}]}) == \
+        {"email": "<str>", "n": {"$in": "<array[2]>"}, "$or": [{"a": "<int>"}]}
+
+
+def test_plan_summary():
+    plan = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "email_unique"}}
+    assert plan_summary(plan) == "FETCH > IXSCAN(email_unique)"
+
+
+def test_redact_plan_drops_literal_values():
+    plan = {
+        "stage": "FETCH",
+        "filter": {"email": {"$eq": "ash@kanto.it"}},
+        "inputStage": {"stage": "IXSCAN", "indexName": "email_unique",
+                       "indexBounds": {"email": ['["ash@kanto.it", "ash@kanto.it"]']}},
+    }
+    assert redact_plan(plan) == {
+        "stage": "FETCH",
+        "filter": {"email": {"$eq": "<str>"}},
+        "inputStage": {"stage": "IXSCAN", "indexName": "email_unique"},
+    }
+
+
+def test_write_batches_are_explained_by_their_first_statement():
+    log = SlowQueryLog(threshold_ms=100, sample_rate=1.0)
+    log._loop = CapturingLoop()
+    updates = [{"q": {"id": str(i)}, "u": {"$set": {"n": i}}} for i in range(3)]
+    run_command(log, "update", {"update": "quiz_stats", "updates": updates, "ordered": False, "lsid": {}})
+    record = log._loop.records[0]
+    assert record["command"] == {"update": "quiz_stats", "updates": updates[:1], "ordered": False}
+    assert record["shape"] == {"id": "<str>"}
+
+
+def test_fast_and_own_commands_are_ignored():
+    log = SlowQueryLog(threshold_ms=100, sample_rate=1.0)
+    log._loop = CapturingLoop()
+    run_command(log, "find", {"find": "users", "filter": {}}, duration_micros=1000)
+    run_command(log, "insert", {"insert": "users"})
+    run_command(log, "find", {"find": "slow_queries", "filter": {}})
+    assert log._loop.records == []
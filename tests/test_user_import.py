@@ -0,0 +1,52 @@
+import asyncio
+
+from server import read_import_rows
+
+
+class FakeRequest:
+    def __init__(self, *chunks):
+        self.chunks = chunks
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def read(import_format, *chunks):
+    async def collect():
+        return [row async for row in read_import_rows(FakeRequest(*chunks), import_format)]
+    return asyncio.run(collect())
+
+
+def test_ndjson_rows_and_errors():
+    body = (
+        b'{"username": "ash", "email": "ash@kanto.it", "password": "pikachu1"}\n'
+        b"\n"
+        b"{not json}\n"
+        b"[1, 2]\n"
+        b'{"username": "misty"}'
+    )
+    rows = read("ndjson", body)
+    assert rows[0] == (1, {"username": "ash", "email": "ash@kanto.it", "password": "pikachu1"})
+    assert rows[1][0] == 3 and rows[1][1].startswith("JSON non valido")
+    assert rows[2] == (4, "La riga deve essere un oggetto JSON")
+    assert rows[3] == (5, {"username": "misty"})
+
+
+def test_csv_header_bom_and_crlf():
+    body = "\ufeffusername, email ,password\r\nash,ash@kanto.it,pikachu1\r\n\"brock, jr\",brock@kanto.it,onix1234\r\n"
+    assert read("csv", body.encode("utf-8")) == [
+        (2, {"username": "ash", "email": "ash@kanto.it", "password": "pikachu1"}),
+        (3, {"username": "brock, jr", "email": "brock@kanto.it", "password": "onix1234"}),
+    ]
+
+
+def test_lines_and_characters_split_across_chunks():
+    body = '{"username": "flabébé"}\n{"username": "ash"}\n'.encode("utf-8")
+    split = body.index("é".encode("utf-8")) + 1  # inside the two bytes of "é"
+    chunks = [body[:split], body[split:split + 10], body[split + 10:]]
+    assert read("ndjson", *chunks) == [(1, {"username": "flabébé"}), (2, {"username": "ash"})]
+
+
+def test_invalid_utf8_is_replaced_not_raised():
+    assert read("ndjson", b'{"username": "a\xffb"}') == [(1, {"username": "a\ufffdb"})]